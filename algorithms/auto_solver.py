@@ -1,48 +1,158 @@
 # algorithms/auto_solver.py
-import heapqd
+import heapq
+import time
+from array import array
+
+from algorithms.junction_graph import junction_graph
+from algorithms.maze import WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT
+
+
+def manhattan_distance(pos1, pos2):
+    """计算曼哈顿距离"""
+    return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+
+class SearchStats:
+    """一次搜索的统计信息"""
+
+    def __init__(self):
+        self.nodes_expanded = 0  # 出队并展开的节点数
+        self.peak_open = 0       # 开放集（堆）的最大长度
+        self.path_length = 0     # 找到的路径包含的格子数
+        self.elapsed = 0.0       # 耗时（秒）
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return f"SearchStats({self.as_dict()})"
+
+
+def reconstruct_path(maze, parent, index):
+    """沿父指针数组回溯出坐标路径"""
+    width = maze.width
+    path = []
+    while index != -1:
+        y, x = divmod(index, width)
+        path.append((x, y))
+        index = parent[index]
+    path.reverse()
+    return path
+
+
+def astar(maze, start=None, goals=None, stats=None):
+    """在一维下标上做A*，找到最近的目标后返回坐标路径，找不到返回None
+
+    每个格子只记录g值和父指针，closed集合是一个位图，
+    路径在结束时沿父指针回溯，不再为每个节点复制路径。
+    """
+    began = time.perf_counter()
+    if stats is None:
+        stats = SearchStats()
+    start = maze.start if start is None else tuple(start)
+    goals = maze.exits if goals is None else [tuple(goal) for goal in goals]
+
+    width = maze.width
+    total = len(maze)
+    last_row = total - width
+    cells = maze.buffer()
+
+    goals = [(gx, gy) for gx, gy in goals if maze.in_bounds(gx, gy)]
+    if not goals:
+        # 没有目标（例如没有出口的迷宫）：不用搜索，启发函数也无从计算
+        stats.elapsed = time.perf_counter() - began
+        return None
+    goal_set = bytearray(total)
+    for gx, gy in goals:
+        goal_set[gy * width + gx] = 1
+    goal_xs = [gx for gx, _ in goals]
+    goal_ys = [gy for _, gy in goals]
+    single_goal = len(goals) == 1
+
+    def heuristic(x, y):
+        if single_goal:
+            return abs(x - goal_xs[0]) + abs(y - goal_ys[0])
+        return min(abs(x - gx) + abs(y - gy) for gx, gy in zip(goal_xs, goal_ys))
+
+    g_score = array('i', [-1]) * total
+    parent = array('i', [-1]) * total
+    closed = bytearray(total)
+
+    start_index = start[1] * width + start[0]
+    g_score[start_index] = 0
+    h = heuristic(*start)
+    open_set = [(h, h, start_index)]
+    peak_open = 1
+    expanded = 0
+    found = -1
+
+    push = heapq.heappush
+    pop = heapq.heappop
+    while open_set:
+        _, _, current = pop(open_set)
+        if closed[current]:
+            continue
+        if goal_set[current]:
+            found = current
+            break
+        closed[current] = 1
+        expanded += 1
+
+        cell = cells[current]
+        y, x = divmod(current, width)
+        g_next = g_score[current] + 1
+        # 检查四个方向：(可走条件, 相邻下标, 相邻坐标)
+        for movable, nxt, nx, ny in (
+            (not cell & WALL_UP and current >= width, current - width, x, y - 1),
+            (not cell & WALL_RIGHT and x < width - 1, current + 1, x + 1, y),
+            (not cell & WALL_DOWN and current < last_row, current + width, x, y + 1),
+            (not cell & WALL_LEFT and x > 0, current - 1, x - 1, y),
+        ):
+            if not movable or closed[nxt]:
+                continue
+            old = g_score[nxt]
+            if old != -1 and old <= g_next:
+                continue
+            g_score[nxt] = g_next
+            parent[nxt] = current
+            h = heuristic(nx, ny)
+            push(open_set, (g_next + h, h, nxt))
+        if len(open_set) > peak_open:
+            peak_open = len(open_set)
+
+    stats.nodes_expanded = expanded
+    stats.peak_open = peak_open
+    path = reconstruct_path(maze, parent, found) if found != -1 else None
+    stats.path_length = len(path) if path else 0
+    stats.elapsed = time.perf_counter() - began
+    return path
+
+
+def graph_astar(maze, start=None, goals=None, stats=None):
+    """在迷宫缓存的路口图上做A*，走廊整段跳过，只在最后展开成格子路径"""
+    if stats is None:
+        stats = SearchStats()
+    return junction_graph(maze).search(start, goals, stats)
+
+
+def find_optimal_path(maze, start=(0, 0), stats=None):
+    """使用路口图上的A*找到到最近出口的最优路径，找不到时返回None"""
+    return graph_astar(maze, start, maze.exits, stats)
+
 
 class AStarSolver:
     def __init__(self, maze):
         self.maze = maze
-        self.size = len(maze)
-        
+        self.size = maze.size
+        self.stats = SearchStats()
+
     def solve(self, start=(0,0), end=None):
         end = end or (self.size-1, self.size-1)
-        open_set = []
-        heapq.heappush(open_set, (0, start))
-        
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: self.heuristic(start, end)}
-
-        while open_set:
-            current = heapq.heappop(open_set)[1]
-            
-            if current == end:
-                return self.reconstruct_path(came_from, current)
-                
-            for neighbor in self.get_neighbors(current):
-                tentative_g = g_score[current] + 1
-                if tentative_g < g_score.get(neighbor, float('inf')):
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g
-                    f = tentative_g + self.heuristic(neighbor, end)
-                    heapq.heappush(open_set, (f, neighbor))
-                    
-        return None
+        self.stats = SearchStats()
+        return graph_astar(self.maze, start, [end], self.stats)
 
     def heuristic(self, a, b):
         return abs(a[0]-b[0]) + abs(a[1]-b[1])
 
     def get_neighbors(self, pos):
-        x, y = pos
-        neighbors = []
-        cell = self.maze[y][x]
-        
-        if not (cell & (1 << 0)): # 可向上
-            neighbors.append((x, y-1))
-        if not (cell & (1 << 1)): # 可向右
-            neighbors.append((x+1, y))
-        # ... 检查其他方向
-        
-        return neighbors
\ No newline at end of file
+        return self.maze.neighbors(*pos)
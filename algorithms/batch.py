@@ -0,0 +1,158 @@
+# algorithms/batch.py
+"""无界面批量运行：在进程池里生成并求解大量迷宫，结果以JSON行输出
+
+用法示例：
+    python batch.py --size 200 --count 1000 --mode complex --solver astar wall_follow
+    python batch.py --size 1000 --count 10 --algorithm division kruskal wilson
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from algorithms import maze_gen
+from algorithms.auto_solver import SearchStats, astar, graph_astar
+from algorithms.tree_index import tree_index
+from algorithms.wall_follow import follow_walls
+
+GENERATORS = {
+    'single': maze_gen.generate_maze,
+    'complex': maze_gen.generate_complex_maze,
+}
+
+
+def solve_astar(maze, search=astar):
+    """A*求解，返回结果字段"""
+    stats = SearchStats()
+    path = search(maze, maze.start, maze.exits, stats)
+    return {
+        'reached': path is not None,
+        'path_length': stats.path_length,
+        'steps': max(stats.path_length - 1, 0),
+        'nodes_expanded': stats.nodes_expanded,
+        'peak_open': stats.peak_open,
+    }
+
+
+def solve_junction(maze):
+    """路口图上的A*求解，返回结果字段"""
+    return solve_astar(maze, graph_astar)
+
+
+def solve_tree(maze):
+    """树索引求最近出口的距离，O(1)查询；迷宫不是生成树或没有出口时视为未求解"""
+    index = tree_index(maze)
+    nearest = index.nearest(maze.start) if index is not None else None
+    if nearest is None:
+        return {'reached': False, 'path_length': None, 'steps': None}
+    _, distance = nearest
+    return {'reached': True, 'path_length': distance + 1, 'steps': distance}
+
+
+def solve_wall_follow(maze):
+    """右手沿墙走，返回结果字段"""
+    result = follow_walls(maze)
+    return {
+        'reached': result.reached_exit,
+        'looped': result.looped,
+        'path_length': None,
+        'steps': result.steps,
+    }
+
+
+SOLVERS = {
+    'astar': solve_astar,
+    'junction': solve_junction,
+    'tree': solve_tree,
+    'wall_follow': solve_wall_follow,
+}
+
+
+def run_task(task):
+    """生成一个迷宫并依次运行各个求解器，返回结果记录列表"""
+    size, mode, seed, solvers, num_exits, algorithm = task
+    began = time.perf_counter()
+    if mode == 'complex':
+        maze = GENERATORS[mode](size, seed, num_exits, algorithm=algorithm)
+    else:
+        maze = GENERATORS[mode](size, seed, algorithm=algorithm)
+    generate_time = time.perf_counter() - began
+
+    records = []
+    for name in solvers:
+        began = time.perf_counter()
+        result = SOLVERS[name](maze)
+        record = {
+            'size': size,
+            'mode': mode,
+            'algorithm': algorithm,
+            'seed': maze.seed,
+            'solver': name,
+            'exits': len(maze.exits),
+            'generate_time': generate_time,
+            'solve_time': time.perf_counter() - began,
+        }
+        record.update(result)
+        records.append(record)
+    return records
+
+
+def make_tasks(sizes, count, mode='single', seed=0, solvers=('astar',), num_exits=None,
+               algorithms=(maze_gen.DEFAULT_ALGORITHM,)):
+    """按尺寸、生成算法和种子展开任务；种子依次为 seed, seed+1, ..."""
+    solvers = tuple(solvers)
+    for size in sizes:
+        for algorithm in algorithms:
+            for offset in range(count):
+                yield (size, mode, seed + offset, solvers, num_exits, algorithm)
+
+
+def run_batch(tasks, workers=None, chunksize=None):
+    """在进程池里执行任务，按完成顺序逐条产出结果记录"""
+    tasks = list(tasks)
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # 每个进程大约分到4块，兼顾负载均衡和进程间通信开销
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+    if workers == 1:
+        for task in tasks:
+            yield from run_task(task)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        for records in pool.imap_unordered(run_task, tasks, chunksize):
+            yield from records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成并求解迷宫，结果以JSON行输出")
+    parser.add_argument('--size', type=int, nargs='+', default=[15], help="迷宫边长，可以给多个")
+    parser.add_argument('--count', type=int, default=1, help="每种尺寸生成的迷宫数量")
+    parser.add_argument('--mode', choices=sorted(GENERATORS), default='single', help="单出口或多出口")
+    parser.add_argument('--algorithm', nargs='+', choices=sorted(maze_gen.ALGORITHMS),
+                        default=[maze_gen.DEFAULT_ALGORITHM], help="生成算法，可以给多个")
+    parser.add_argument('--seed', type=int, default=0, help="起始种子")
+    parser.add_argument('--exits', type=int, default=None, help="多出口模式的出口数，默认随机3-4个")
+    parser.add_argument('--solver', nargs='+', choices=sorted(SOLVERS), default=['astar'])
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认等于CPU核数")
+    parser.add_argument('--chunksize', type=int, default=None, help="每次分给进程的任务数")
+    parser.add_argument('--out', default='-', help="输出文件，默认标准输出")
+    args = parser.parse_args(argv)
+
+    tasks = make_tasks(args.size, args.count, args.mode, args.seed, args.solver, args.exits,
+                       args.algorithm)
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', encoding='utf-8')
+    try:
+        for record in run_batch(tasks, args.workers, args.chunksize):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# algorithms/distance_field.py
+from algorithms.flood_fill import NO_STEP, FloodFill
+from algorithms.maze import DIRECTIONS
+
+
+class DistanceField:
+    """从所有出口同时做一次反向BFS，得到每个格子到最近出口的距离和下一步方向
+
+    BFS 本身由 FloodFill 完成。progress(已到达, 总数) 定期被调用，抛出异常即可取消。
+    """
+
+    def __init__(self, maze, stats=None, progress=None):
+        # 以出口为源做一次逐波扩展，父方向就是朝出口的下一步
+        fill = FloodFill(maze, stats=stats, progress=progress)
+        self.maze = maze
+        self._distance = fill._distance
+        self._next_step = fill._direction
+        self.distance = fill.distance
+        self.next_step = fill.direction
+        self.elapsed = fill.elapsed
+
+    def distance_at(self, pos):
+        """到最近出口的步数，无法到达时返回-1"""
+        return self._distance[pos[1] * self.maze.width + pos[0]]
+
+    def next_position(self, pos):
+        """沿梯度走一步后的位置；已在出口或无法到达时返回None"""
+        direction = self._next_step[pos[1] * self.maze.width + pos[0]]
+        if direction == NO_STEP:
+            return None
+        dx, dy = DIRECTIONS[direction]
+        return (pos[0] + dx, pos[1] + dy)
+
+    def route(self, pos):
+        """从pos沿梯度走到最近出口的完整路径，无法到达时返回None"""
+        pos = tuple(pos)
+        if self.distance_at(pos) == -1:
+            return None
+        path = [pos]
+        while True:
+            pos = self.next_position(pos)
+            if pos is None:
+                return path
+            path.append(pos)
+
+
+def distance_field(maze, stats=None, progress=None):
+    """取出迷宫上缓存的距离场，没有时构建；迷宫被修改或重新生成后自动失效"""
+    return maze.derived('distance_field', lambda: DistanceField(maze, stats, progress))
@@ -0,0 +1,190 @@
+# algorithms/dstar_lite.py
+import heapq
+import time
+from array import array
+
+from algorithms.maze import DIRECTIONS, WALL_BITS
+
+INF = 2 ** 31 - 1
+PROGRESS_INTERVAL = 0xFFFF  # 每展开这么多格子回调一次进度
+
+
+class DStarLite:
+    """墙会变化的迷宫上的增量重规划（D* Lite）
+
+    从所有出口反向搜索，g/rhs 存在按一维下标索引的数组里。小车移动时只累加
+    km，墙变化时只更新墙两侧的格子，再次 compute_shortest_path() 只处理受影响的区域。
+    """
+
+    def __init__(self, maze, start=None, goals=None):
+        self.maze = maze
+        self.width = maze.width
+        total = len(maze)
+        start = maze.start if start is None else tuple(start)
+        goals = maze.exits if goals is None else goals
+        self.cells = bytearray(maze.buffer())  # 自己维护一份墙壁掩码，墙变化时只改两格
+        self.g = array('i', [INF]) * total
+        self.rhs = array('i', [INF]) * total
+        self.goal = bytearray(total)
+        self.start = start[1] * self.width + start[0]
+        self.last = self.start
+        self.km = 0
+        self._open = []
+        self._key = {}  # 在开放集里的格子 -> 当前有效的键；堆里键不一致的条目是过期的
+        for gx, gy in goals:
+            if maze.in_bounds(gx, gy):
+                index = gy * self.width + gx
+                self.goal[index] = 1
+                self.rhs[index] = 0
+                self._push(index, (self._h(index), 0))
+        self.expanded = 0
+        self.stats = None
+
+    def _h(self, index):
+        """到当前起点（小车位置）的曼哈顿距离"""
+        y, x = divmod(index, self.width)
+        sy, sx = divmod(self.start, self.width)
+        return abs(x - sx) + abs(y - sy)
+
+    def _calculate_key(self, index):
+        best = min(self.g[index], self.rhs[index])
+        if best == INF:
+            return (INF, INF)
+        return (best + self._h(index) + self.km, best)
+
+    def _push(self, index, key):
+        self._key[index] = key
+        heapq.heappush(self._open, (key[0], key[1], index))
+
+    def _top(self):
+        """开放集中键最小的有效条目，顺带丢弃过期条目"""
+        open_set = self._open
+        while open_set:
+            k1, k2, index = open_set[0]
+            if self._key.get(index) == (k1, k2):
+                return (k1, k2), index
+            heapq.heappop(open_set)
+        return (INF, INF), -1
+
+    def neighbors(self, index):
+        """相邻且没有墙隔开的格子（无向，同时是前驱和后继）"""
+        width = self.width
+        y, x = divmod(index, width)
+        cell = self.cells[index]
+        result = []
+        for direction, (dx, dy) in enumerate(DIRECTIONS):
+            nx, ny = x + dx, y + dy
+            if not cell & WALL_BITS[direction] and self.maze.in_bounds(nx, ny):
+                result.append(ny * width + nx)
+        return result
+
+    def _update_vertex(self, index):
+        if not self.goal[index]:
+            g = self.g
+            best = INF
+            for nxt in self.neighbors(index):
+                if g[nxt] != INF and g[nxt] + 1 < best:
+                    best = g[nxt] + 1
+            self.rhs[index] = best
+        self._key.pop(index, None)
+        if self.g[index] != self.rhs[index]:
+            self._push(index, self._calculate_key(index))
+
+    def compute_shortest_path(self, stats=None, progress=None):
+        """把起点的g值修正到一致，返回本次展开的格子数
+
+        progress(已展开, 格子总数) 定期被调用，抛出异常即可取消。
+        """
+        began = time.perf_counter()
+        g, rhs = self.g, self.rhs
+        total = len(g)
+        expanded = 0
+        peak = len(self._key)
+        while True:
+            key, index = self._top()
+            start_key = self._calculate_key(self.start)
+            if index == -1 or (key >= start_key and rhs[self.start] == g[self.start]):
+                break
+            new_key = self._calculate_key(index)
+            if key < new_key:
+                self._push(index, new_key)
+                continue
+            heapq.heappop(self._open)
+            del self._key[index]
+            expanded += 1
+            if progress is not None and not expanded & PROGRESS_INTERVAL:
+                progress(expanded, total)
+            if g[index] > rhs[index]:
+                g[index] = rhs[index]
+                for nxt in self.neighbors(index):
+                    self._update_vertex(nxt)
+            else:
+                g[index] = INF
+                self._update_vertex(index)
+                for nxt in self.neighbors(index):
+                    self._update_vertex(nxt)
+            if len(self._key) > peak:
+                peak = len(self._key)
+
+        self.expanded += expanded
+        if stats is not None:
+            stats.nodes_expanded = expanded
+            stats.peak_open = peak
+            stats.elapsed = time.perf_counter() - began
+            stats.path_length = g[self.start] + 1 if g[self.start] != INF else 0
+            self.stats = stats
+        return expanded
+
+    def move_to(self, pos):
+        """小车移动到pos：只累加km，不重建开放集"""
+        index = pos[1] * self.width + pos[0]
+        self.start = index
+        self.km += self._h(self.last)
+        self.last = index
+
+    def update_walls(self, positions):
+        """墙变化后调用，positions为墙两侧发生变化的格子坐标
+
+        边的代价只影响两端格子的rhs，其余的传播留给下一次 compute_shortest_path()。
+        """
+        for x, y in positions:
+            index = y * self.width + x
+            self.cells[index] = self.maze.wall(x, y)
+        for x, y in positions:
+            self._update_vertex(y * self.width + x)
+
+    def distance(self):
+        """当前起点到最近出口的步数，无法到达时为None"""
+        value = self.g[self.start]
+        return None if value == INF else value
+
+    def next_position(self):
+        """朝出口走的下一格；已在出口或无路可走时返回None"""
+        if self.goal[self.start] or self.g[self.start] == INF:
+            return None
+        g = self.g
+        best = min(self.neighbors(self.start), key=lambda nxt: g[nxt], default=None)
+        if best is None or g[best] == INF:
+            return None
+        return self.maze.position(best)
+
+    def path(self):
+        """按当前g值从起点走到出口的完整路径，无法到达时返回None"""
+        if self.g[self.start] == INF:
+            return None
+        g = self.g
+        current = self.start
+        path = [self.maze.position(current)]
+        while not self.goal[current]:
+            current = min(self.neighbors(current), key=lambda nxt: g[nxt])
+            if g[current] == INF or len(path) > len(g):
+                return None
+            path.append(self.maze.position(current))
+        return path
+
+
+def plan(maze, start=None, stats=None, progress=None):
+    """建立规划器并完成第一次规划；可以在工作线程里调用"""
+    planner = DStarLite(maze, start)
+    planner.compute_shortest_path(stats, progress)
+    return planner
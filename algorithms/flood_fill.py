@@ -0,0 +1,154 @@
+# algorithms/flood_fill.py
+import time
+
+import numpy as np
+
+from algorithms.maze import ALL_WALLS, WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT
+
+NO_STEP = 255  # 源格子或无法到达的格子没有父方向
+PROGRESS_INTERVAL = 65536  # 每到达这么多格子回调一次进度
+SMALL_FRONTIER = 64   # 波前格子数低于该值时逐格处理，省掉数组运算的固定开销
+
+# 方向：墙位、反方向（父方向）
+_BITS = (WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT)
+_BACK = (2, 3, 0, 1)
+
+
+class FloodFill:
+    """NumPy逐波扩展的多源BFS：得到每个格子到最近源格子的距离和指向父格子的方向
+
+    每一波同时向四个方向扩展：取波前格子的可走方向掩码（墙位 1/2/4/8 取反），
+    按方向平移下标后再去掉已经到达过的格子。波前是一维下标数组，很小时逐格处理。
+    四连通迷宫的一波最多只有边长量级的格子，而层数可能很多（DFS迷宫的最远距离
+    接近格子总数的十分之一），所以不用整张布尔网格做平移：每一波扫描全图反而更慢。
+    加速主要来自分支多、波前宽的迷宫；DFS迷宫几乎全是单格波前，与逐格BFS相差不大。
+
+    sources 为坐标列表，默认为迷宫的出口。progress(已到达, 总数) 定期被调用。
+    """
+
+    def __init__(self, maze, sources=None, stats=None, progress=None):
+        began = time.perf_counter()
+        self.maze = maze
+        width, height = maze.width, maze.height
+        total = len(maze)
+        # 每格可走方向的掩码（第d位为1表示方向d没有墙且不出界），一次性由墙位取反得到
+        cells = np.frombuffer(maze.buffer(), dtype=np.uint8).reshape(height, width)
+        moves = ~cells & ALL_WALLS
+        moves[0, :] &= ~np.uint8(WALL_UP)
+        moves[:, -1] &= ~np.uint8(WALL_RIGHT)
+        moves[-1, :] &= ~np.uint8(WALL_DOWN)
+        moves[:, 0] &= ~np.uint8(WALL_LEFT)
+        self.moves = moves.reshape(-1)
+        self._moves = moves.tobytes()
+        self.offsets = (-width, 1, width, -1)
+        self.distance = np.full(total, -1, dtype=np.int32)
+        self.direction = np.full(total, NO_STEP, dtype=np.uint8)
+        # 逐格处理时用内存视图按下标读写，比NumPy标量索引快得多
+        self._distance = memoryview(self.distance)
+        self._direction = memoryview(self.direction)
+
+        sources = maze.exits if sources is None else sources
+        frontier = sorted({y * width + x for x, y in sources if maze.in_bounds(x, y)})
+        for index in frontier:
+            self._distance[index] = 0
+
+        reached = len(frontier)
+        peak = reached
+        level = 0
+        reported = 0
+        while len(frontier):
+            level += 1
+            # 小波前是Python列表，大波前是下标数组，只在跨过阈值时转换
+            if len(frontier) < SMALL_FRONTIER:
+                if not isinstance(frontier, list):
+                    frontier = frontier.tolist()
+                frontier = self._expand_small(frontier, level)
+            else:
+                frontier = self._expand_sparse(np.asarray(frontier, dtype=np.int64), level)
+            reached += len(frontier)
+            if progress is not None and reached - reported >= PROGRESS_INTERVAL:
+                reported = reached
+                progress(reached, total)
+            if len(frontier) > peak:
+                peak = len(frontier)
+
+        self.levels = level - 1 if level else 0  # 最远的格子到源的距离
+        self.reached = reached
+        self.distance = self.distance.reshape(height, width)
+        self.direction = self.direction.reshape(height, width)
+        self.elapsed = time.perf_counter() - began
+        if stats is not None:
+            stats.nodes_expanded = reached
+            stats.peak_open = peak
+            stats.elapsed = self.elapsed
+
+    def _expand_small(self, frontier, level):
+        """逐格扩展一波，返回下一波的格子列表"""
+        moves, distance, direction = self._moves, self._distance, self._direction
+        width = self.maze.width
+        following = []
+        append = following.append
+        for current in frontier:
+            cell = moves[current]
+            if cell & WALL_UP:
+                nxt = current - width
+                if distance[nxt] < 0:
+                    distance[nxt] = level
+                    direction[nxt] = 2
+                    append(nxt)
+            if cell & WALL_RIGHT:
+                nxt = current + 1
+                if distance[nxt] < 0:
+                    distance[nxt] = level
+                    direction[nxt] = 3
+                    append(nxt)
+            if cell & WALL_DOWN:
+                nxt = current + width
+                if distance[nxt] < 0:
+                    distance[nxt] = level
+                    direction[nxt] = 0
+                    append(nxt)
+            if cell & WALL_LEFT:
+                nxt = current - 1
+                if distance[nxt] < 0:
+                    distance[nxt] = level
+                    direction[nxt] = 1
+                    append(nxt)
+        return following
+
+    def _expand_sparse(self, frontier, level):
+        """波前为下标数组：四个方向各做一次掩码、平移和去重"""
+        moves = self.moves[frontier]
+        parts = []
+        for d in range(4):
+            moved = frontier[(moves & _BITS[d]) != 0] + self.offsets[d]
+            # 依次处理各方向，前面方向已到达的格子在这里就被去掉，不会重复
+            moved = moved[self.distance[moved] < 0]
+            self.distance[moved] = level
+            self.direction[moved] = _BACK[d]
+            parts.append(moved)
+        return np.concatenate(parts)
+
+    def distance_at(self, pos):
+        """到最近源格子的步数，无法到达时返回-1"""
+        return int(self.distance[pos[1], pos[0]])
+
+    def route(self, pos):
+        """从pos沿父方向走到最近源格子的路径，无法到达时返回None"""
+        x, y = pos
+        if self.distance[y, x] < 0:
+            return None
+        direction = self.direction
+        path = [(x, y)]
+        steps = ((0, -1), (1, 0), (0, 1), (-1, 0))
+        while direction[y, x] != NO_STEP:
+            dx, dy = steps[direction[y, x]]
+            x += dx
+            y += dy
+            path.append((x, y))
+        return path
+
+
+def flood_fill(maze, sources=None, stats=None, progress=None):
+    """多源BFS的距离图和父方向，见 FloodFill"""
+    return FloodFill(maze, sources, stats, progress)
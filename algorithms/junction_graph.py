@@ -0,0 +1,286 @@
+# algorithms/junction_graph.py
+import heapq
+import time
+from array import array
+
+import numpy as np
+
+from algorithms.maze import WALL_BITS
+
+# NEXT_DIRECTION[通行掩码][来向] -> 走廊格子里另一个可走的方向
+NEXT_DIRECTION = [[next((d for d in range(4) if mask >> d & 1 and d != back), -1)
+                   for back in range(4)] for mask in range(16)]
+
+
+class JunctionGraph:
+    """把走廊收缩成带权边的路口图
+
+    度不为2的格子（死胡同、岔路口）和出口是节点，两个节点之间的走廊是一条边，
+    边权为步数，并按顺序记下走廊内部的格子，只在输出最终路径时展开回格子。
+    """
+
+    def __init__(self, maze):
+        began = time.perf_counter()
+        self.maze = maze
+        width, height = maze.width, maze.height
+        total = len(maze)
+        cells = np.frombuffer(maze.buffer(), dtype=np.uint8).reshape(height, width)
+
+        # 每个格子可走的方向，第d位表示方向d可走且不出界
+        moves = np.zeros((height, width), dtype=np.uint8)
+        for direction, bit in enumerate(WALL_BITS):
+            moves |= ((cells & bit) == 0).astype(np.uint8) << direction
+        moves[0, :] &= ~np.uint8(1)
+        moves[:, -1] &= ~np.uint8(2)
+        moves[-1, :] &= ~np.uint8(4)
+        moves[:, 0] &= ~np.uint8(8)
+        degree = np.zeros((height, width), dtype=np.uint8)
+        for direction in range(4):
+            degree += (moves >> direction) & 1
+
+        is_node = (degree != 2).reshape(-1)
+        for x, y in maze.exits:
+            if maze.in_bounds(x, y):
+                is_node[y * width + x] = True
+        node_cells = np.flatnonzero(is_node).astype(np.int32)
+        node_of = np.full(total, -1, dtype=np.int32)
+        node_of[node_cells] = np.arange(len(node_cells), dtype=np.int32)
+
+        self.node_cell = array('i', node_cells.tobytes())
+        self.node_of = array('i', node_of.tobytes())
+        self.edge_of = array('i', [-1]) * total  # 走廊内部格子所属的边
+        self.edge_a = array('i')
+        self.edge_b = array('i')
+        self.runs = []  # 每条边从a到b依次经过的内部格子
+        self.adjacency = [[] for _ in range(len(node_cells))]  # 节点 -> [(邻居, 边权, 边)]
+        self._build(moves.tobytes(), width)
+        self.elapsed = time.perf_counter() - began
+
+    def _build(self, moves, width):
+        node_of = self.node_of
+        edge_of = self.edge_of
+        offsets = (-width, 1, width, -1)
+        for node, start in enumerate(self.node_cell):
+            mask = moves[start]
+            for direction in range(4):
+                if not mask >> direction & 1:
+                    continue
+                current = start + offsets[direction]
+                other = node_of[current]
+                if other >= 0:
+                    if node < other:  # 两个节点直接相邻，只记一次
+                        self._add_edge(node, other, array('i'))
+                    continue
+                if edge_of[current] != -1:
+                    continue  # 这条走廊已经从另一端走过
+
+                edge = len(self.runs)
+                run = array('i')
+                back = (direction + 2) % 4
+                while node_of[current] < 0:
+                    run.append(current)
+                    edge_of[current] = edge
+                    step = NEXT_DIRECTION[moves[current]][back]
+                    back = (step + 2) % 4
+                    current += offsets[step]
+                self._add_edge(node, node_of[current], run)
+
+    def _add_edge(self, a, b, run):
+        edge = len(self.runs)
+        self.edge_a.append(a)
+        self.edge_b.append(b)
+        self.runs.append(run)
+        weight = len(run) + 1
+        self.adjacency[a].append((b, weight, edge))
+        if b != a:
+            self.adjacency[b].append((a, weight, edge))
+
+    @property
+    def node_count(self):
+        return len(self.node_cell)
+
+    @property
+    def edge_count(self):
+        return len(self.runs)
+
+    def _segment(self, edge, from_node):
+        """沿边从from_node一端走到另一端时经过的内部格子"""
+        run = self.runs[edge]
+        if from_node == self.edge_a[edge]:
+            return list(run)
+        return list(reversed(run))
+
+    def _partial(self, edge, position, toward_b):
+        """从走廊内部第position个格子走向一端时经过的格子（不含起点）"""
+        run = self.runs[edge]
+        if toward_b:
+            return list(run[position + 1:])
+        return list(reversed(run[:position]))
+
+    def search(self, start=None, goals=None, stats=None):
+        """在路口图上做A*，找到最近的目标后展开成坐标路径，找不到返回None
+
+        起点和目标可以在走廊中间：起点按到两端的步数接入图，
+        目标在展开经过它所在的边时作为候选入队。
+        """
+        began = time.perf_counter()
+        maze = self.maze
+        width = maze.width
+        start = maze.start if start is None else tuple(start)
+        goals = maze.exits if goals is None else [tuple(goal) for goal in goals]
+        goals = [goal for goal in goals if maze.in_bounds(*goal)]
+        goal_xs = [gx for gx, _ in goals]
+        goal_ys = [gy for _, gy in goals]
+
+        def heuristic(cell):
+            y, x = divmod(cell, width)
+            return min((abs(x - gx) + abs(y - gy) for gx, gy in zip(goal_xs, goal_ys)), default=0)
+
+        node_of, edge_of, node_cell = self.node_of, self.edge_of, self.node_cell
+        edge_a, runs = self.edge_a, self.runs
+        goal_nodes = set()
+        goal_edges = {}  # 边 -> [(在走廊中的位置, 目标下标)]
+        for gx, gy in goals:
+            cell = gy * width + gx
+            if node_of[cell] >= 0:
+                goal_nodes.add(node_of[cell])
+            elif edge_of[cell] >= 0:
+                edge = edge_of[cell]
+                goal_edges.setdefault(edge, []).append((runs[edge].index(cell), cell))
+
+        count = self.node_count
+        g_score = array('i', [-1]) * count
+        parent = array('i', [-1]) * count  # 前一个节点；-2表示直接从走廊中的起点到达
+        parent_edge = array('i', [-1]) * count
+        closed = bytearray(count)
+        candidates = []  # 候选目标：(前一个节点或-2, 边, 位置, 格子, 是否从b端进入)；状态编号为 count + 下标
+        open_set = []
+        push = heapq.heappush
+        pop = heapq.heappop
+
+        start_cell = start[1] * width + start[0]
+        start_edge = -1
+        start_toward_b = False
+        if node_of[start_cell] >= 0:
+            node = node_of[start_cell]
+            g_score[node] = 0
+            open_set.append((heuristic(start_cell), 0, node))
+        elif edge_of[start_cell] >= 0:
+            # 起点在走廊中间：到两端的步数作为初始代价
+            start_edge = edge_of[start_cell]
+            run = runs[start_edge]
+            position = run.index(start_cell)
+            for node, cost, toward_b in ((edge_a[start_edge], position + 1, False),
+                                         (self.edge_b[start_edge], len(run) - position, True)):
+                if g_score[node] == -1 or cost < g_score[node]:
+                    g_score[node] = cost
+                    parent[node] = -2
+                    parent_edge[node] = start_edge
+                    start_toward_b = toward_b  # 两端是同一个节点（环形走廊）时记住走哪一头
+                    push(open_set, (cost + heuristic(node_cell[node]), cost, node))
+            for goal_position, cell in goal_edges.get(start_edge, ()):
+                candidates.append((-2, start_edge, goal_position, cell, False))
+                cost = abs(goal_position - position)
+                push(open_set, (cost, cost, count + len(candidates) - 1))
+        else:
+            return None  # 起点在不和任何路口相连的环形走廊里
+
+        peak_open = len(open_set)
+        expanded = 0
+        found = -1
+        while open_set:
+            _, g, current = pop(open_set)
+            if current >= count:
+                found = current
+                break
+            if closed[current]:
+                continue
+            if current in goal_nodes:
+                found = current
+                break
+            closed[current] = 1
+            expanded += 1
+            for neighbor, weight, edge in self.adjacency[current]:
+                on_edge = goal_edges.get(edge)
+                if on_edge:
+                    # 环形走廊两端是同一个节点，两个方向都要试
+                    sides = (current == edge_a[edge], current == self.edge_b[edge])
+                    for goal_position, cell in on_edge:
+                        for from_b in (False, True):
+                            if not sides[from_b]:
+                                continue
+                            cost = g + (len(runs[edge]) - goal_position if from_b else goal_position + 1)
+                            candidates.append((current, edge, goal_position, cell, from_b))
+                            push(open_set, (cost, cost, count + len(candidates) - 1))
+                if closed[neighbor]:
+                    continue
+                cost = g + weight
+                old = g_score[neighbor]
+                if old != -1 and old <= cost:
+                    continue
+                g_score[neighbor] = cost
+                parent[neighbor] = current
+                parent_edge[neighbor] = edge
+                push(open_set, (cost + heuristic(node_cell[neighbor]), cost, neighbor))
+            if len(open_set) > peak_open:
+                peak_open = len(open_set)
+
+        path = None
+        if found != -1:
+            path = [maze.position(cell) for cell in self._expand(found, start_cell, start_toward_b,
+                                                                  parent, parent_edge, candidates)]
+        if stats is not None:
+            stats.nodes_expanded = expanded
+            stats.peak_open = peak_open
+            stats.path_length = len(path) if path else 0
+            stats.elapsed = time.perf_counter() - began
+        return path
+
+    def _expand(self, found, start_cell, start_toward_b, parent, parent_edge, candidates):
+        """把节点序列展开回格子下标序列"""
+        count = self.node_count
+        tail = []
+        if found >= count:
+            previous, edge, goal_position, cell, from_b = candidates[found - count]
+            if previous == -2:  # 起点和目标在同一条走廊里
+                run = self.runs[edge]
+                position = run.index(start_cell)
+                if goal_position >= position:
+                    return list(run[position:goal_position + 1])
+                return list(reversed(run[goal_position:position + 1]))
+            run = self.runs[edge]
+            if from_b:
+                tail = list(reversed(run[goal_position:]))
+            else:
+                tail = list(run[:goal_position + 1])
+            node = previous
+        else:
+            node = found
+
+        segments = [tail]
+        while True:
+            segments.append([self.node_cell[node]])
+            previous = parent[node]
+            if previous == -1:
+                break
+            edge = parent_edge[node]
+            if previous == -2:
+                run = self.runs[edge]
+                toward_b = node == self.edge_b[edge]
+                if self.edge_a[edge] == self.edge_b[edge]:
+                    toward_b = start_toward_b
+                segments.append(self._partial(edge, run.index(start_cell), toward_b))
+                segments.append([start_cell])
+                break
+            segments.append(self._segment(edge, previous))
+            node = previous
+
+        cells = []
+        for segment in reversed(segments):
+            cells.extend(segment)
+        return cells
+
+
+def junction_graph(maze):
+    """取出迷宫上缓存的路口图，没有时构建；迷宫被修改后随派生数据一起失效"""
+    return maze.derived('junction_graph', lambda: JunctionGraph(maze))
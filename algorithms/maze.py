@@ -0,0 +1,262 @@
+# algorithms/maze.py
+import numpy as np
+
+# 方向编号：0:上, 1:右, 2:下, 3:左
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+# 每个单元格用4位表示墙：1=上, 2=右, 4=下, 8=左
+WALL_UP = 1
+WALL_RIGHT = 2
+WALL_DOWN = 4
+WALL_LEFT = 8
+ALL_WALLS = 15
+WALL_BITS = (WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT)
+OPPOSITE_WALLS = (WALL_DOWN, WALL_LEFT, WALL_UP, WALL_RIGHT)
+
+
+def direction_of(dx, dy):
+    """根据位移求方向编号，不是单位位移时返回None"""
+    try:
+        return DIRECTIONS.index((dx, dy))
+    except ValueError:
+        return None
+
+
+def pack_cells(cells):
+    """把墙壁掩码两格压成一个字节：偶数列放低4位，奇数列放高4位"""
+    cells = np.asarray(cells, dtype=np.uint8)
+    if cells.shape[-1] % 2:
+        cells = np.concatenate([cells, np.zeros(cells.shape[:-1] + (1,), dtype=np.uint8)], axis=-1)
+    return (cells[..., 0::2] & 15) | (cells[..., 1::2] << 4)
+
+
+def unpack_cells(packed, width):
+    """pack_cells 的逆运算，width 为解包后的列数"""
+    packed = np.asarray(packed, dtype=np.uint8)
+    cells = np.empty(packed.shape[:-1] + (packed.shape[-1] * 2,), dtype=np.uint8)
+    cells[..., 0::2] = packed & 15
+    cells[..., 1::2] = packed >> 4
+    return cells[..., :width]
+
+
+class PackedCells:
+    """只读的压缩墙壁掩码，每字节两格，通常是磁盘文件的内存映射
+
+    按 cells[y, x] 或切片访问时只解包用到的行列，接口和二维uint8数组一致。
+    """
+
+    dtype = np.dtype(np.uint8)
+    ndim = 2
+
+    def __init__(self, packed, width):
+        if packed.shape[1] != (width + 1) // 2:
+            raise ValueError(f"压缩数组宽度 {packed.shape[1]} 与迷宫宽度 {width} 不符")
+        self.packed = packed
+        self.shape = (packed.shape[0], width)
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+
+    def __getitem__(self, key):
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        width = self.shape[1]
+        if isinstance(cols, slice):
+            start, stop, step = cols.indices(width)
+            if step != 1 or stop <= start:
+                return unpack_cells(self.packed[rows], width)[..., cols]
+            block = self.packed[rows, start >> 1:(stop + 1) >> 1]
+            offset = start & 1
+            return unpack_cells(block, offset + stop - start)[..., offset:]
+        x = int(cols)
+        if x < 0:
+            x += width
+        byte = self.packed[rows, x >> 1]
+        return byte >> 4 if x & 1 else byte & 15
+
+    def __array__(self, dtype=None, copy=None):
+        cells = unpack_cells(self.packed, self.shape[1])
+        return cells if dtype is None else cells.astype(dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def copy(self):
+        """解包成可写的普通数组"""
+        return np.asarray(self)
+
+    def reshape(self, *shape):
+        return np.asarray(self).reshape(*shape)
+
+    def tobytes(self):
+        return np.asarray(self).tobytes()
+
+    def tolist(self):
+        return np.asarray(self).tolist()
+
+
+class Maze:
+    """不依赖Qt的迷宫数据：连续的uint8墙壁掩码，加上出口、起点和元数据"""
+
+    def __init__(self, width, height=None, cells=None, exits=None,
+                 start=(0, 0), seed=None, is_complex=False, meta=None):
+        height = width if height is None else height
+        if cells is None:
+            cells = np.full((height, width), ALL_WALLS, dtype=np.uint8)
+        elif isinstance(cells, PackedCells):
+            if cells.shape != (height, width):
+                raise ValueError(f"墙壁数组形状 {cells.shape} 与迷宫尺寸 {(height, width)} 不符")
+        else:
+            cells = np.ascontiguousarray(cells, dtype=np.uint8)
+            if cells.shape != (height, width):
+                raise ValueError(f"墙壁数组形状 {cells.shape} 与迷宫尺寸 {(height, width)} 不符")
+        self.width = width
+        self.height = height
+        self.cells = cells
+        self.start = tuple(start)
+        self.seed = seed
+        self.is_complex = is_complex
+        self.meta = dict(meta or {})
+        self.version = 0  # 墙壁被修改时递增
+        self._derived = {}  # 派生数据缓存（求解结果、距离场等）
+        self.exits = exits if exits is not None else [(width-1, height-1)]
+
+    @property
+    def size(self):
+        """正方形迷宫的边长（兼容旧接口）"""
+        return self.width
+
+    @property
+    def exits(self):
+        return self._exits
+
+    @exits.setter
+    def exits(self, exits):
+        self._exits = [tuple(pos) for pos in exits]
+        self._exit_set = frozenset(self._exits)
+        self._derived.clear()
+
+    @property
+    def flat(self):
+        """按行展开的一维视图（不复制；压缩存储时为解包后的数组）"""
+        return self.cells.reshape(-1)
+
+    @property
+    def nbytes(self):
+        return self.cells.nbytes
+
+    @property
+    def is_packed(self):
+        """墙壁掩码是否为只读的压缩存储（从文件映射而来）"""
+        return isinstance(self.cells, PackedCells)
+
+    def __len__(self):
+        return self.width * self.height
+
+    def index(self, x, y):
+        """坐标转一维下标"""
+        return y * self.width + x
+
+    def position(self, index):
+        """一维下标转坐标"""
+        y, x = divmod(int(index), self.width)
+        return (x, y)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def wall(self, x, y):
+        """读取单元格的墙壁掩码"""
+        return int(self.cells[y, x])
+
+    def is_exit(self, pos):
+        return tuple(pos) in self._exit_set
+
+    def can_move(self, x, y, dx, dy):
+        """检查从(x, y)能否向(dx, dy)方向移动一格"""
+        if not self.in_bounds(x + dx, y + dy):
+            return False
+        direction = direction_of(dx, dy)
+        if direction is None:
+            return False
+        return not (self.cells[y, x] & WALL_BITS[direction])
+
+    def can_move_between(self, pos1, pos2):
+        """检查两个相邻位置之间是否可以移动"""
+        return self.can_move(pos1[0], pos1[1], pos2[0] - pos1[0], pos2[1] - pos1[1])
+
+    def neighbors(self, x, y):
+        """返回从(x, y)可以直接到达的相邻格子"""
+        cell = self.cells[y, x]
+        result = []
+        for direction, (dx, dy) in enumerate(DIRECTIONS):
+            nx, ny = x + dx, y + dy
+            if not (cell & WALL_BITS[direction]) and self.in_bounds(nx, ny):
+                result.append((nx, ny))
+        return result
+
+    def set_wall(self, x, y, direction, closed=True):
+        """打开或关上(x, y)在direction方向的墙，相邻格子的对应位一起更新
+
+        压缩存储的迷宫是只读的，需要先 copy()。
+        """
+        if self.is_packed:
+            raise ValueError("压缩存储的迷宫是只读的，请先调用 copy()")
+        cells = self.cells
+        bit = WALL_BITS[direction]
+        if closed:
+            cells[y, x] |= bit
+        else:
+            cells[y, x] &= ALL_WALLS ^ bit
+        dx, dy = DIRECTIONS[direction]
+        nx, ny = x + dx, y + dy
+        if self.in_bounds(nx, ny):
+            bit = OPPOSITE_WALLS[direction]
+            if closed:
+                cells[ny, nx] |= bit
+            else:
+                cells[ny, nx] &= ALL_WALLS ^ bit
+        self.touch()
+
+    def buffer(self):
+        """返回墙壁掩码的只读bytes副本，供纯Python循环快速按下标读取"""
+        return self.derived('buffer', self.cells.tobytes)
+
+    def derived(self, key, build):
+        """取出派生数据，不存在时调用build()构建并缓存
+
+        build() 可能在工作线程里运行；构建期间墙壁被修改时结果照常返回但不缓存，
+        以免把按旧墙壁算出的数据留给之后的调用。
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            version = self.version
+            value = build()
+            if self.version == version:
+                self._derived[key] = value
+            return value
+
+    def touch(self):
+        """墙壁被修改后调用：递增版本号并清空派生数据"""
+        self.version += 1
+        self._derived.clear()
+
+    def copy(self):
+        return Maze(self.width, self.height, self.cells.copy(), self.exits,
+                    self.start, self.seed, self.is_complex, self.meta)
+
+    def to_lists(self):
+        """转换为旧的列表嵌套格式"""
+        return self.cells.tolist()
+
+    @classmethod
+    def from_lists(cls, rows, **kwargs):
+        """从旧的列表嵌套格式构建迷宫"""
+        cells = np.array(rows, dtype=np.uint8)
+        height, width = cells.shape
+        return cls(width, height, cells, **kwargs)
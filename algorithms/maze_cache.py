@@ -0,0 +1,130 @@
+# algorithms/maze_cache.py
+import os
+import threading
+from collections import OrderedDict
+
+from algorithms import maze_gen
+from algorithms.maze_file import MazeFileError, load_maze, save_maze
+
+
+class MazeCache:
+    """按 (尺寸, 模式, 种子, 出口数, 生成算法) 缓存生成好的迷宫
+
+    内存里是一个LRU，迷宫上挂着的派生数据（最优路径、距离场等）随迷宫一起缓存；
+    指定 store_dir 时还会把迷宫以压缩二进制格式写到磁盘，下次运行直接内存映射加载，
+    不再重新生成。从磁盘加载的迷宫墙壁只读。
+
+    界面线程和线程池里的任务会同时读写缓存，LRU和计数都由一把锁保护；
+    生成和读写磁盘在锁外进行，不会阻塞其他线程取缓存。
+    """
+
+    def __init__(self, capacity=16, store_dir=None):
+        self.capacity = capacity
+        self.store_dir = store_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+
+    @staticmethod
+    def key(size, mode='single', seed=None, num_exits=None, algorithm=maze_gen.DEFAULT_ALGORITHM):
+        if mode == 'single':
+            num_exits = None  # 单出口迷宫的出口数固定
+        return (size, mode, seed, num_exits, algorithm)
+
+    def get(self, size, mode='single', seed=None, num_exits=None, progress=None,
+            algorithm=maze_gen.DEFAULT_ALGORITHM):
+        """取出迷宫；不在缓存里时从磁盘加载或重新生成。未给种子时随机选一个
+
+        progress 传给生成器，用于报告进度和取消。
+        """
+        if seed is None:
+            seed, _ = maze_gen.make_rng()
+        key = self.key(size, mode, seed, num_exits, algorithm)
+        with self._lock:
+            maze = self._entries.get(key)
+            if maze is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return maze
+            self.misses += 1
+
+        maze = self._load(key)
+        if maze is None:
+            maze = self._generate(key, progress)
+            self._save(key, maze)
+        self.put(key, maze)
+        return maze
+
+    def put(self, key, maze):
+        with self._lock:
+            self._entries[key] = maze
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits,
+                'disk_writes': self.disk_writes,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @staticmethod
+    def _generate(key, progress=None):
+        size, mode, seed, num_exits, algorithm = key
+        if mode == 'complex':
+            return maze_gen.generate_complex_maze(size, seed, num_exits, progress, algorithm)
+        return maze_gen.generate_maze(size, seed, progress, algorithm)
+
+    def _path(self, key):
+        size, mode, seed, num_exits, algorithm = key
+        exits = 'auto' if num_exits is None else num_exits
+        if algorithm != maze_gen.DEFAULT_ALGORITHM:
+            mode = f"{mode}_{algorithm}"  # 默认算法沿用原来的文件名
+        return os.path.join(self.store_dir, f"{mode}_{size}_{seed}_{exits}.maze")
+
+    def _load(self, key):
+        if not self.store_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            maze = load_maze(path)
+        except MazeFileError:
+            return None  # 损坏的文件当作不存在，重新生成后覆盖
+        with self._lock:
+            self.disk_hits += 1
+        maze.meta['algorithm'] = key[-1]  # 文件里不记录生成算法
+        return maze
+
+    def _save(self, key, maze):
+        if not self.store_dir:
+            return
+        save_maze(maze, self._path(key))
+        with self._lock:
+            self.disk_writes += 1
@@ -0,0 +1,167 @@
+# algorithms/maze_file.py
+"""迷宫的二进制文件格式
+
+布局（小端）：
+    文件头   魔数 b'MAZE'、格式版本、标志位、宽、高、种子、起点、出口数、压缩数据的CRC32
+    出口表   出口数 x (int32 x, int32 y)
+    填充     补齐到8字节边界
+    墙壁数据 高 x ceil(宽/2) 字节，每字节两格：偶数列在低4位，奇数列在高4位
+
+加载时墙壁数据用 np.memmap 直接映射，不读入内存也不创建逐格的Python对象，
+10000x10000 的迷宫约占 50 MB。
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from algorithms.maze import Maze, PackedCells, ALL_WALLS, pack_cells
+from algorithms.maze_gen import decode_events
+
+MAGIC = b'MAZE'
+FORMAT_VERSION = 1
+FLAG_COMPLEX = 1
+FLAG_SEED = 2  # 种子有效；没有种子时种子字段为0
+
+_HEADER = struct.Struct('<4sHHIIqiiII')
+_ALIGN = 8
+
+
+class MazeFileError(ValueError):
+    """文件不是迷宫文件、版本不支持或数据损坏"""
+
+
+def _data_offset(num_exits):
+    offset = _HEADER.size + 8 * num_exits
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def save_maze(maze, path):
+    """把迷宫写入文件；先写临时文件再改名，不会留下写了一半的文件"""
+    if maze.is_packed:
+        packed = maze.cells.packed
+    else:
+        packed = pack_cells(maze.cells)
+    _write(path, maze.width, maze.height, packed, maze.exits, maze.start, maze.seed, maze.is_complex)
+
+
+def _prefix(width, height, exits, start, seed, is_complex, crc):
+    """文件头、出口表和填充，墙壁数据从返回的字节串之后开始"""
+    flags = (FLAG_COMPLEX if is_complex else 0) | (FLAG_SEED if seed is not None else 0)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, flags, width, height,
+                          seed or 0, start[0], start[1], len(exits), crc)
+    exits = np.array(exits, dtype='<i4').reshape(-1, 2)
+    padding = _data_offset(len(exits)) - _HEADER.size - exits.nbytes
+    return header + exits.tobytes() + b'\0' * padding
+
+
+def _write(path, width, height, packed, exits, start, seed, is_complex):
+    packed = np.ascontiguousarray(packed)
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(_prefix(width, height, exits, start, seed, is_complex, zlib.crc32(packed)))
+        f.write(packed.data)
+    os.replace(temp, path)
+
+
+def write_rows(stream, path):
+    """把逐行产出墙壁掩码的流（如 maze_gen.EllerStream）写成迷宫文件
+
+    每行压缩后立即写出并累加CRC，最后回到文件头补上校验和；
+    内存只有一行那么多，迷宫的高度不受内存限制。
+    """
+    width, height = stream.width, stream.height
+    exits, start, seed, is_complex = stream.exits, stream.start, stream.seed, stream.is_complex
+    temp = path + '.tmp'
+    crc = 0
+    rows = 0
+    with open(temp, 'wb') as f:
+        f.write(_prefix(width, height, exits, start, seed, is_complex, 0))
+        for row in stream:
+            packed = pack_cells(row.reshape(1, width))
+            crc = zlib.crc32(packed, crc)
+            f.write(packed.data)
+            rows += 1
+        if rows != height:
+            raise ValueError(f"行数 {rows} 与迷宫高度 {height} 不符")
+        f.seek(0)
+        f.write(_prefix(width, height, exits, start, seed, is_complex, crc))
+    os.replace(temp, path)
+
+
+class MazeWriter:
+    """边生成边写：逐块接收挖墙事件，只保存压缩后的墙壁（每格4位），事件用完即弃"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        row = pack_cells(np.full((1, width), ALL_WALLS, dtype=np.uint8))
+        self.packed = np.repeat(row, height, axis=0)
+
+    def apply(self, events):
+        width = self.width
+        row_bytes = self.packed.shape[1]
+        flat = self.packed.reshape(-1)
+        index, bits, neighbor, neighbor_bits = decode_events(events, width, self.height)
+        for cells, bits in ((index, bits), (neighbor, neighbor_bits)):
+            y, x = np.divmod(cells, width)
+            shift = ((x & 1) * 4).astype(np.uint8)
+            np.bitwise_and.at(flat, y * row_bytes + (x >> 1), ~(bits << shift))
+
+    def save(self, path, exits, start=(0, 0), seed=None, is_complex=False):
+        _write(path, self.width, self.height, self.packed, exits, start, seed, is_complex)
+
+
+def write_stream(stream, path):
+    """把 maze_gen.CarveStream 的事件流直接写成迷宫文件，不在内存里保留事件历史"""
+    writer = MazeWriter(stream.width, stream.height)
+    for events in stream:
+        writer.apply(events)
+    writer.save(path, stream.exits, stream.start, stream.seed, stream.is_complex)
+
+
+def read_header(path):
+    """只读取文件头和出口表，返回字典"""
+    with open(path, 'rb') as f:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            raise MazeFileError(f"{path}: 文件太短")
+        (magic, version, flags, width, height, seed,
+         start_x, start_y, num_exits, crc) = _HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise MazeFileError(f"{path}: 不是迷宫文件")
+        if version != FORMAT_VERSION:
+            raise MazeFileError(f"{path}: 不支持的格式版本 {version}")
+        exits = np.frombuffer(f.read(8 * num_exits), dtype='<i4')
+    if len(exits) != 2 * num_exits:
+        raise MazeFileError(f"{path}: 出口表不完整")
+    return {
+        'width': width,
+        'height': height,
+        'seed': seed if flags & FLAG_SEED else None,
+        'is_complex': bool(flags & FLAG_COMPLEX),
+        'start': (start_x, start_y),
+        'exits': [tuple(pos) for pos in exits.reshape(-1, 2).tolist()],
+        'crc32': crc,
+        'offset': _data_offset(num_exits),
+    }
+
+
+def load_maze(path, verify=True):
+    """以内存映射方式加载迷宫，墙壁掩码是只读的 PackedCells
+
+    verify 为真时校验CRC32，这需要把整个文件读一遍；很大的迷宫可以跳过。
+    需要修改墙壁时先调用 maze.copy() 得到普通数组存储的迷宫。
+    """
+    header = read_header(path)
+    width, height = header['width'], header['height']
+    row_bytes = (width + 1) // 2
+    if os.path.getsize(path) < header['offset'] + row_bytes * height:
+        raise MazeFileError(f"{path}: 墙壁数据不完整")
+    packed = np.memmap(path, dtype=np.uint8, mode='r', offset=header['offset'],
+                       shape=(height, row_bytes))
+    if verify and zlib.crc32(packed) != header['crc32']:
+        raise MazeFileError(f"{path}: 校验和不匹配，文件已损坏")
+    return Maze(width, height, PackedCells(packed, width), header['exits'],
+                header['start'], header['seed'], header['is_complex'])
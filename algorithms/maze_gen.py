@@ -1,46 +1,526 @@
 # algorithms/maze_gen.py
+import itertools
 import random
-from enum import Enum
+from array import array
 
-class Direction(Enum):
-    UP = 0
-    RIGHT = 1
-    DOWN = 2
-    LEFT = 3
+import numpy as np
 
-class MazeGenerator:
-    def __init__(self, size=15):
+from algorithms.maze import (Maze, ALL_WALLS, DIRECTIONS, WALL_BITS, OPPOSITE_WALLS,
+                            WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT)
+
+
+# 四个方向的全部24种排列，每一步随机取一种作为尝试顺序
+_PERMUTATIONS = tuple(itertools.permutations(range(4)))
+
+
+def make_rng(seed=None):
+    """返回(种子, 随机数生成器)；未指定种子时随机选一个，保证结果可以复现"""
+    if seed is None:
+        seed = random.randrange(2**32)
+    return seed, random.Random(seed)
+
+
+PROGRESS_INTERVAL = 0xFFFF  # 每处理这么多格子回调一次进度
+CHUNK_SIZE = 4096  # 事件流每块的事件数
+
+# 方向 -> (dx, dy) 和对应的墙位，供向量化解码事件时查表
+_DX = np.array([dx for dx, _ in DIRECTIONS], dtype=np.int64)
+_DY = np.array([dy for _, dy in DIRECTIONS], dtype=np.int64)
+WALL_MASKS = np.array(WALL_BITS, dtype=np.uint8)
+OPPOSITE_MASKS = np.array(OPPOSITE_WALLS, dtype=np.uint8)
+
+
+def carve_events(width, height, rng, start=(0, 0), chunk_size=CHUNK_SIZE, progress=None):
+    """递归回溯（DFS）生成完美迷宫，以事件流的形式逐块产出
+
+    每个事件编码为 格子下标*4 + 方向，表示打通该格子在该方向上的墙，
+    同时打开那一侧的新格子。每块是一个int64数组，最多 chunk_size 个事件，
+    迭代过程中不保留已经产出的事件。
+
+    栈和访问标记放在预先分配的数组里；外面围一圈已访问的哨兵格子，
+    循环里不需要边界判断。progress(已完成, 总数) 定期被调用，抛出异常即可取消。
+    """
+    stride = width + 2
+    total = stride * (height + 2)
+
+    visited = bytearray(b'\x01') * total
+    for y in range(1, height + 1):
+        row = y * stride + 1
+        visited[row:row + width] = bytes(width)
+
+    # 每种排列展开为 (下标偏移, 方向)
+    offsets = (-stride, 1, stride, -1)
+    orders = [tuple((offsets[d], d) for d in perm) for perm in _PERMUTATIONS]
+    count = len(orders)
+    rand = rng.random
+
+    stack = [0] * (width * height)
+    start_index = (start[1] + 1) * stride + start[0] + 1
+    stack[0] = start_index
+    visited[start_index] = 1
+    top = 1
+    carved = 1
+    cell_count = width * height
+    events = array('q')
+    record = events.append
+
+    while top:
+        current = stack[top - 1]
+        for offset, direction in orders[int(rand() * count)]:
+            nxt = current + offset
+            if not visited[nxt]:
+                visited[nxt] = 1
+                record(current * 4 + direction)
+                stack[top] = nxt
+                top += 1
+                carved += 1
+                if not carved & PROGRESS_INTERVAL and progress is not None:
+                    progress(carved, cell_count)
+                if len(events) >= chunk_size:
+                    yield _unpad(events, stride, width)
+                    events = array('q')
+                    record = events.append
+                break
+        else:
+            top -= 1
+    if events:
+        yield _unpad(events, stride, width)
+
+
+def _unpad(events, stride, width):
+    """带哨兵边框的下标换算回迷宫内的下标，方向不变"""
+    events = np.frombuffer(events, dtype=np.int64)
+    padded, direction = events >> 2, events & 3
+    y, x = np.divmod(padded, stride)
+    return ((y - 1) * width + (x - 1)) * 4 + direction
+
+
+def _chunks(events, chunk_size):
+    """把一整个事件数组按 chunk_size 切块产出"""
+    for begin in range(0, len(events), chunk_size):
+        yield events[begin:begin + chunk_size]
+
+
+def _ranges(starts, lengths):
+    """把多个区间 [start, start+length) 首尾相接展开成一个下标数组"""
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths - starts, lengths)
+
+
+def division_events(width, height, rng, start=(0, 0), chunk_size=CHUNK_SIZE, progress=None):
+    """递归分割生成完美迷宫：从没有内墙的空地开始，每次用一道留了一个缺口的墙把区域一分为二
+
+    同一层递归的所有区域放在数组里一起处理，砌墙是切片赋值，Python循环只有递归层数那么多次。
+    分割完成后，剩下没有墙的内部边就是挖墙事件，按格子顺序产出。
+    """
+    gen = np.random.default_rng(rng.getrandbits(64))
+    total = width * height
+    right = np.ones((height, width), dtype=bool)  # 和右边的格子之间是通的
+    down = np.ones((height, width), dtype=bool)   # 和下面的格子之间是通的
+    right[:, -1] = False
+    down[-1, :] = False
+
+    x = np.zeros(1, dtype=np.int64)
+    y = np.zeros(1, dtype=np.int64)
+    w = np.full(1, width, dtype=np.int64)
+    h = np.full(1, height, dtype=np.int64)
+    done = 0
+    while len(x):
+        keep = (w >= 2) & (h >= 2)
+        if progress is not None:
+            done += int(np.sum(w[~keep] * h[~keep]))
+            progress(done, total)
+        x, y, w, h = x[keep], y[keep], w[keep], h[keep]
+        count = len(x)
+        if not count:
+            break
+        # 宽的区域竖着切，高的区域横着切，正方形随机
+        vertical = (w > h) | ((w == h) & (gen.random(count) < 0.5))
+        span = np.where(vertical, w, h)
+        cut = 1 + (gen.random(count) * (span - 1)).astype(np.int64)  # 墙在第cut-1和第cut行（列）之间
+        gap = (gen.random(count) * np.where(vertical, h, w)).astype(np.int64)
+
+        v = vertical
+        column = x[v] + cut[v] - 1
+        right[_ranges(y[v], h[v]), np.repeat(column, h[v])] = False
+        right[y[v] + gap[v], column] = True
+        hz = ~vertical
+        row = y[hz] + cut[hz] - 1
+        down[np.repeat(row, w[hz]), _ranges(x[hz], w[hz])] = False
+        down[row, x[hz] + gap[hz]] = True
+
+        # 每个区域分成两半，进入下一层
+        x = np.concatenate([x, np.where(v, x + cut, x)])
+        y = np.concatenate([y, np.where(v, y, y + cut)])
+        w, h = (np.concatenate([np.where(v, cut, w), np.where(v, w - cut, w)]),
+                np.concatenate([np.where(v, h, cut), np.where(v, h, h - cut)]))
+
+    events = np.concatenate([np.flatnonzero(right) * 4 + 1, np.flatnonzero(down) * 4 + 2])
+    events.sort()
+    yield from _chunks(events, chunk_size)
+
+
+def kruskal_events(width, height, rng, start=(0, 0), chunk_size=CHUNK_SIZE, progress=None):
+    """随机Kruskal：所有内墙打乱顺序，墙两侧不连通就打通，用带路径压缩的并查集判断连通性"""
+    gen = np.random.default_rng(rng.getrandbits(64))
+    total = width * height
+    cells = np.arange(total, dtype=np.int64).reshape(height, width)
+    edges = np.concatenate([cells[:, :-1].reshape(-1) * 4 + 1, cells[:-1, :].reshape(-1) * 4 + 2])
+    gen.shuffle(edges)
+
+    parent = array('i', range(total))
+    size = array('i', [1]) * total
+    events = array('q')
+    record = events.append
+    carved = 1
+    # 打乱后的内墙分块转成Python整数，整张表约2*格子数项，一次全转会占用大量内存
+    for block in _chunks(edges, chunk_size):
+        for edge in block.tolist():
+            a = edge >> 2
+            b = a + 1 if edge & 3 == 1 else a + width
+            while parent[a] != a:  # 路径折半：边找根边把节点挂到祖父上
+                parent[a] = a = parent[parent[a]]
+            while parent[b] != b:
+                parent[b] = b = parent[parent[b]]
+            if a == b:
+                continue
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+            record(edge)
+            carved += 1
+            if not carved & PROGRESS_INTERVAL and progress is not None:
+                progress(carved, total)
+            if len(events) >= chunk_size:
+                yield np.frombuffer(events, dtype=np.int64)
+                events = array('q')
+                record = events.append
+            if carved == total:
+                break  # 已经是生成树，剩下的墙都不用看
+        if carved == total:
+            break
+    if events:
+        yield np.frombuffer(events, dtype=np.int64)
+
+
+def wilson_events(width, height, rng, start=(0, 0), chunk_size=CHUNK_SIZE, progress=None):
+    """Wilson算法：从树外的格子随机游走直到碰到树，把擦除回路后的路径并入树
+
+    生成的是所有生成树中均匀抽取的一棵，没有DFS那样的长走廊偏好。游走时每个格子
+    只记最后一次离开的方向，沿着它从起点重走一遍就是擦除了回路的路径。
+    """
+    stride = width + 2
+    total = stride * (height + 2)
+    outside = bytearray(b'\x01') * total
+    for y in range(1, height + 1):
+        row = y * stride + 1
+        outside[row:row + width] = bytes(width)
+
+    offsets = (-stride, 1, stride, -1)
+    in_tree = bytearray(total)
+    exit_direction = bytearray(total)
+    root = (start[1] + 1) * stride + start[0] + 1
+    in_tree[root] = 1
+    rand = rng.random
+    cell_count = width * height
+    carved = 1
+    events = array('q')
+    record = events.append
+
+    for y in range(1, height + 1):
+        for cell in range(y * stride + 1, y * stride + width + 1):
+            if in_tree[cell]:
+                continue
+            current = cell
+            while not in_tree[current]:
+                direction = int(rand() * 4)
+                nxt = current + offsets[direction]
+                if outside[nxt]:
+                    continue
+                exit_direction[current] = direction
+                current = nxt
+            current = cell
+            while not in_tree[current]:
+                in_tree[current] = 1
+                direction = exit_direction[current]
+                record(current * 4 + direction)
+                current += offsets[direction]
+                carved += 1
+                if not carved & PROGRESS_INTERVAL and progress is not None:
+                    progress(carved, cell_count)
+                if len(events) >= chunk_size:
+                    yield _unpad(events, stride, width)
+                    events = array('q')
+                    record = events.append
+    if events:
+        yield _unpad(events, stride, width)
+
+
+def eller_rows(width, height, rng, progress=None):
+    """Eller算法逐行生成完美迷宫，每次产出一行墙壁掩码（长为width的uint8数组）
+
+    只保存当前一行的集合关系：同一集合的格子用循环双向链表 left/right 串起来。
+    迷宫是平面的，集合之间不会交叉，链表始终按从左到右排列，判断相邻两格是否
+    同属一个集合只要看 right[x] == x+1。内存只和宽度成正比，与高度无关。
+    外圈的墙全部保留，入口和出口由调用方打开。
+    """
+    rand = rng.random
+    left = array('i', range(width))
+    right = array('i', range(width))
+    up_open = np.zeros(width, dtype=bool)
+    last_x = width - 1
+    for y in range(height):
+        bottom = y == height - 1
+        join = bytearray(width)  # 和右边的格子打通
+        down = bytearray(width)  # 和下面的格子打通
+        for x in range(width):
+            nxt = x + 1
+            if x < last_x and right[x] != nxt and (bottom or rand() < 0.5):
+                # 把 x+1 所在的集合接到 x 后面
+                right[left[nxt]] = right[x]
+                left[right[x]] = left[nxt]
+                right[x] = nxt
+                left[nxt] = x
+                join[x] = 1
+            if bottom:
+                continue
+            if left[x] != x and rand() < 0.5:
+                # 不向下打通：x 离开所在集合，下一行的这一格从单独的集合开始
+                right[left[x]] = right[x]
+                left[right[x]] = left[x]
+                left[x] = right[x] = x
+            else:
+                down[x] = 1  # 集合里只剩 x 时必须向下打通，否则这个集合就断了
+
+        row = np.full(width, ALL_WALLS, dtype=np.uint8)
+        joined = np.frombuffer(join, dtype=bool)
+        row[joined] &= ~np.uint8(WALL_RIGHT)
+        row[1:][joined[:-1]] &= ~np.uint8(WALL_LEFT)
+        row[up_open] &= ~np.uint8(WALL_UP)
+        up_open = np.frombuffer(down, dtype=bool)
+        row[up_open] &= ~np.uint8(WALL_DOWN)
+        if progress is not None:
+            progress(y + 1, height)
+        yield row
+
+
+def eller_events(width, height, rng, start=(0, 0), chunk_size=CHUNK_SIZE, progress=None):
+    """把 eller_rows 的逐行墙壁掩码转换成挖墙事件，供事件流水线使用"""
+    pending = []
+    count = 0
+    for y, row in enumerate(eller_rows(width, height, rng, progress)):
+        base = y * width
+        opened = [(np.flatnonzero((row & WALL_RIGHT) == 0) + base) * 4 + 1,
+                  (np.flatnonzero((row & WALL_DOWN) == 0) + base) * 4 + 2]
+        pending.extend(opened)
+        count += len(opened[0]) + len(opened[1])
+        if count >= chunk_size:
+            merged = np.concatenate(pending)
+            whole = len(merged) - len(merged) % chunk_size
+            yield from _chunks(merged[:whole], chunk_size)
+            pending = [merged[whole:]]
+            count = len(pending[0])
+    if count:
+        yield np.concatenate(pending)
+
+
+# 生成算法注册表：名称 -> 事件流函数，签名与 carve_events 相同，
+# 产出的都是 格子下标*4+方向 的挖墙事件，流水线、动画和文件写入对所有算法通用
+ALGORITHMS = {
+    'dfs': carve_events,
+    'division': division_events,
+    'kruskal': kruskal_events,
+    'wilson': wilson_events,
+    'eller': eller_events,
+}
+DEFAULT_ALGORITHM = 'dfs'
+
+
+def decode_events(events, width, height):
+    """把一块事件解码为 (格子下标, 要清除的墙位, 相邻格子下标, 相邻格子要清除的墙位)
+
+    指向迷宫外的方向（出口、入口）没有相邻格子。
+    """
+    index, direction = events >> 2, events & 3
+    nx = index % width + _DX[direction]
+    ny = index // width + _DY[direction]
+    inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+    neighbor = ny[inside] * width + nx[inside]
+    return (index, WALL_MASKS[direction], neighbor, OPPOSITE_MASKS[direction[inside]])
+
+
+def apply_events(cells, events):
+    """把一块挖墙事件应用到 (高, 宽) 的墙壁数组上，返回涉及到的格子下标
+
+    同一块里一个格子可能被打通多面墙，所以用 np.bitwise_and.at 累积。
+    """
+    height, width = cells.shape
+    flat = cells.reshape(-1)
+    index, bits, neighbor, neighbor_bits = decode_events(events, width, height)
+    np.bitwise_and.at(flat, index, ALL_WALLS ^ bits)
+    np.bitwise_and.at(flat, neighbor, ALL_WALLS ^ neighbor_bits)
+    return np.concatenate([index, neighbor])
+
+
+def carve_dfs(maze, rng, start=(0, 0), progress=None):
+    """一次性消费 carve_events 的事件流，在迷宫上打通墙壁"""
+    cells = maze.cells
+    for events in carve_events(maze.width, maze.height, rng, start, progress=progress):
+        apply_events(cells, events)
+    maze.touch()
+    return maze
+
+
+class CarveStream:
+    """完整的迷宫生成事件流：先是所选算法的挖墙事件，最后一块打开入口和出口
+
+    迭代得到一块块事件（见 carve_events）；迭代结束后 exits、start、seed 可用。
+    与 generate_maze / generate_complex_maze 使用同样的随机数顺序，同一种子结果相同。
+    algorithm 为 ALGORITHMS 中的名称。
+    """
+
+    def __init__(self, size, mode='single', seed=None, num_exits=None,
+                 chunk_size=CHUNK_SIZE, progress=None, algorithm=DEFAULT_ALGORITHM):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"未知的生成算法：{algorithm}")
         self.size = size
-        self.maze = [[15 for _ in range(size)] for _ in range(size)] # 每个单元格4位表示墙
+        self.width = self.height = size
+        self.mode = mode
+        self.algorithm = algorithm
+        self.is_complex = mode == 'complex'
+        self.seed, self.rng = make_rng(seed)
+        self.num_exits = num_exits
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.start = (0, 0)
+        self.exits = None
+        self.events = 0  # 已产出的事件数
+
+    def __iter__(self):
+        size = self.size
+        carve = ALGORITHMS[self.algorithm]
+        for events in carve(size, size, self.rng, self.start, self.chunk_size, self.progress):
+            self.events += len(events)
+            yield events
+
+        if self.is_complex:
+            num_exits = self.num_exits
+            if num_exits is None:
+                num_exits = self.rng.randint(3, 4)
+            self.exits = place_exits(size, num_exits, self.rng)
+        else:
+            self.exits = [(size-1, size-1)]
+
+        # 打通出口和入口通向迷宫外的墙
+        final = []
+        for exit_x, exit_y in self.exits:
+            index = exit_y * size + exit_x
+            if exit_x == size-1:  # 右边界
+                final.append(index * 4 + 1)
+            if exit_y == size-1 and (self.is_complex or exit_x != size-1):  # 下边界
+                final.append(index * 4 + 2)
+        final.append(3)  # 起点左墙
+        self.events += len(final)
+        yield np.array(final, dtype=np.int64)
+
+    def maze(self):
+        """生成结束后的迷宫对象（空墙壁，需要先应用全部事件）"""
+        return Maze(self.size, seed=self.seed, is_complex=self.is_complex,
+                    meta={'algorithm': self.algorithm})
 
-    def generate(self):
-        self._divide(0, 0, self.size, self.size)
-        self._set_entrance_exit()
-        return self.maze
 
-    def _divide(self, x, y, width, height):
-        if width < 2 or height < 2:
-            return
+def build_maze(stream):
+    """消费整个事件流，返回生成好的迷宫"""
+    maze = stream.maze()
+    for events in stream:
+        apply_events(maze.cells, events)
+    maze.exits = stream.exits
+    maze.touch()
+    return maze
 
-        # 随机选择分割方向
-        if width > height:
-            self._divide_vertical(x, y, width, height)
+
+class EllerStream:
+    """按行产出的单出口迷宫：入口在左上角左侧，出口在右下角右侧
+
+    迭代得到每一行的墙壁掩码，全程只占用与宽度成正比的内存，可以生成放不进内存的
+    超高迷宫，直接交给 maze_file.write_rows 写入文件或交给别的消费者。
+    """
+
+    def __init__(self, width, height, seed=None, progress=None):
+        self.width = width
+        self.height = height
+        self.seed, self.rng = make_rng(seed)
+        self.progress = progress
+        self.start = (0, 0)
+        self.exits = [(width - 1, height - 1)]
+        self.is_complex = False
+
+    def __iter__(self):
+        last = self.height - 1
+        for y, row in enumerate(eller_rows(self.width, self.height, self.rng, self.progress)):
+            if y == 0:
+                row[0] &= ~np.uint8(WALL_LEFT)
+            if y == last:
+                row[-1] &= ~np.uint8(WALL_RIGHT)
+            yield row
+
+
+def generate_maze(size, seed=None, progress=None, algorithm=DEFAULT_ALGORITHM):
+    """生成单出口迷宫，出口在右下角"""
+    return build_maze(CarveStream(size, 'single', seed, progress=progress, algorithm=algorithm))
+
+
+def place_exits(size, num_exits, rng, min_distance=None):
+    """在右边界和下边界上选出彼此间隔足够远的出口，耗时与边界长度呈线性
+
+    把右边界（自上而下）和下边界（自右向左）连成一条长 2*size-1 的折线，
+    折线上两点的下标差恰好等于它们的曼哈顿距离，问题就变成一维的间隔采样：
+    先在扣除 (k-1)*最小距离 的余量里随机取k个有序位置，再依次加上间隔，
+    一次就能得到满足距离要求的出口，不需要反复筛选和重试。
+    """
+    if min_distance is None:
+        min_distance = size // 3  # 确保出口之间至少间隔迷宫大小的1/3
+    last = 2 * size - 2
+    # 离起点太近（x + y <= size//2）的格子不作为出口，剩下的是折线上连续的一段
+    low = max(0, size // 2 - size + 2)
+    high = last - low
+    length = high - low
+    if length < 0:
+        return []
+
+    # 放不下时减小间隔，但不小于2（与原来的退让策略一致），仍放不下就少放几个
+    floor = max(1, min(2, min_distance))
+    num_exits = min(num_exits, length // floor + 1)
+    spacing = min(min_distance, length // (num_exits - 1)) if num_exits > 1 else 0
+    slack = length - spacing * (num_exits - 1)
+    offsets = sorted(rng.randint(0, slack) for _ in range(num_exits))
+
+    exits = []
+    for i, offset in enumerate(offsets):
+        t = low + offset + i * spacing
+        if t <= size - 1:
+            exits.append((size - 1, t))        # 右边界
         else:
-            self._divide_horizontal(x, y, width, height)
-
-    def _divide_vertical(self, x, y, width, height):
-        split = random.randint(x+1, x+width-2)
-        gap = random.randint(y, y+height-1)
-        
-        for row in range(y, y+height):
-            if row != gap:
-                self.maze[row][split] |= 1 << Direction.LEFT.value
-                self.maze[row][split-1] |= 1 << Direction.RIGHT.value
-
-        self._divide(x, y, split-x, height)
-        self._divide(split, y, x+width-split, height)
-
-    def _set_entrance_exit(self):
-        # 入口在左上，出口在右下
-        self.maze[0][0] &= ~(1 << Direction.UP.value)
-        self.maze[-1][-1] &= ~(1 << Direction.DOWN.value)
\ No newline at end of file
+            exits.append((last - t, size - 1))  # 下边界
+    return exits
+
+
+def generate_complex_maze(size, seed=None, num_exits=None, progress=None, algorithm=DEFAULT_ALGORITHM):
+    """生成多出口的复杂迷宫，num_exits 默认为随机的3-4个"""
+    return build_maze(CarveStream(size, 'complex', seed, num_exits, progress=progress,
+                                  algorithm=algorithm))
+
+
+class MazeGenerator:
+    """旧接口：按指定算法（默认递归分割）生成单出口迷宫"""
+
+    def __init__(self, size=15, algorithm='division', seed=None):
+        self.size = size
+        self.algorithm = algorithm
+        self.seed = seed
+        self.maze = None
+
+    def generate(self):
+        self.maze = generate_maze(self.size, self.seed, algorithm=self.algorithm)
+        return self.maze
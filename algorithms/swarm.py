@@ -0,0 +1,115 @@
+# algorithms/swarm.py
+import numpy as np
+
+from algorithms.distance_field import NO_STEP, distance_field
+from algorithms.maze import WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT
+
+# 车辆种类
+WALL_FOLLOWER = 0   # 右手沿墙
+FIELD_FOLLOWER = 1  # 沿出口距离场的梯度走最短路（与A*的路线等长）
+RANDOM_WALKER = 2   # 每步随机选一个能走的方向
+KINDS = (WALL_FOLLOWER, FIELD_FOLLOWER, RANDOM_WALKER)
+
+# 右手法则依次尝试：右转、直行、左转，都不通时原地掉头
+_TURNS = np.array([1, 0, 3], dtype=np.uint8)
+
+
+class Swarm:
+    """多车集群：位置、朝向、种类都存在NumPy数组里，每一步对所有车一起做查表"""
+
+    def __init__(self, maze, count, kinds=KINDS, seed=None, start=None):
+        self.maze = maze
+        self.rng = np.random.default_rng(seed)
+        width = maze.width
+        total = len(maze)
+
+        # 外圈强制补上墙，和 follow_walls 一样，出口的缺口不会把车带出迷宫
+        walls = np.array(maze.cells, dtype=np.uint8)
+        walls[0, :] |= WALL_UP
+        walls[-1, :] |= WALL_DOWN
+        walls[:, 0] |= WALL_LEFT
+        walls[:, -1] |= WALL_RIGHT
+        self.walls = walls.reshape(-1)
+        self.offsets = np.array([-width, 1, width, -1], dtype=np.int64)
+        self.goal = np.zeros(total, dtype=bool)
+        for x, y in maze.exits:
+            if maze.in_bounds(x, y):
+                self.goal[y * width + x] = True
+        self._next_step = None
+
+        if start is None:
+            positions = self.rng.integers(0, total, count)
+        else:
+            positions = np.full(count, start[1] * width + start[0])
+        self.positions = positions.astype(np.int64)
+        self.headings = np.full(count, 1, dtype=np.uint8)  # 初始朝右
+        self.kinds = np.resize(np.asarray(kinds, dtype=np.uint8), count)
+        self.arrived = self.goal[self.positions]
+        self.ticks = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def next_step(self):
+        """出口距离场的下一步方向表，有距离场跟随者时才构建"""
+        if self._next_step is None:
+            self._next_step = distance_field(self.maze).next_step.reshape(-1)
+        return self._next_step
+
+    def _blocked(self, positions, directions):
+        return (self.walls[positions] >> directions) & 1
+
+    def step(self):
+        """所有未到达出口的车各走一步，返回本步仍在行驶的车数"""
+        active = ~self.arrived
+        positions = self.positions
+        headings = self.headings
+
+        follower = np.flatnonzero(active & (self.kinds == WALL_FOLLOWER))
+        if len(follower):
+            pos = positions[follower]
+            tries = (headings[follower, None] + _TURNS) & 3  # (车数, 3)
+            blocked = self._blocked(pos[:, None], tries)
+            choice = np.argmin(blocked, axis=1)
+            can_move = blocked[np.arange(len(follower)), choice] == 0
+            direction = tries[np.arange(len(follower)), choice]
+            # 三面都是墙：原地掉头
+            direction = np.where(can_move, direction, (headings[follower] + 2) & 3).astype(np.uint8)
+            headings[follower] = direction
+            positions[follower] = pos + np.where(can_move, self.offsets[direction], 0)
+
+        field = np.flatnonzero(active & (self.kinds == FIELD_FOLLOWER))
+        if len(field):
+            pos = positions[field]
+            direction = self.next_step[pos]
+            moving = direction != NO_STEP
+            headings[field[moving]] = direction[moving]
+            positions[field[moving]] = pos[moving] + self.offsets[direction[moving]]
+
+        walker = np.flatnonzero(active & (self.kinds == RANDOM_WALKER))
+        if len(walker):
+            pos = positions[walker]
+            # 每个方向一个随机优先级，墙后的方向置为-1，取最大者
+            priority = self.rng.random((len(walker), 4))
+            blocked = self._blocked(pos[:, None], np.arange(4, dtype=np.uint8)) != 0
+            priority[blocked] = -1
+            direction = np.argmax(priority, axis=1)
+            moving = ~blocked[np.arange(len(walker)), direction]
+            headings[walker[moving]] = direction[moving]
+            positions[walker[moving]] = pos[moving] + self.offsets[direction[moving]]
+
+        self.arrived |= self.goal[positions]
+        self.ticks += 1
+        return int(np.count_nonzero(~self.arrived))
+
+    def coordinates(self):
+        """所有车的 (x, y) 坐标数组"""
+        y, x = np.divmod(self.positions, self.maze.width)
+        return x, y
+
+    def counts(self):
+        """各种类的车数和已到达出口的车数"""
+        return {int(kind): (int(np.count_nonzero(self.kinds == kind)),
+                            int(np.count_nonzero(self.arrived & (self.kinds == kind))))
+                for kind in KINDS}
@@ -0,0 +1,222 @@
+# algorithms/trajectory.py
+"""小车轨迹的紧凑记录和文件格式
+
+每步只记方向编号（2位，每字节4步），每 KEYFRAME_INTERVAL 步存一个关键帧坐标。
+定位到任意一步时从最近的关键帧出发，查表数出其后各方向的步数即可，
+与轨迹总长无关。一百万步的轨迹约 250 KB。
+
+文件布局（小端）：
+    文件头   魔数 b'TRAJ'、格式版本、标志位、迷宫宽高、种子、轨迹起点、出口数、
+             墙壁CRC32、步数、关键帧间隔、生成算法、运行模式、数据的CRC32
+    出口表   出口数 x (int32 x, int32 y)
+    关键帧   (步数 // 间隔 + 1) x (int32 x, int32 y)
+    移动数据 ceil(步数 / 4) 字节，第i步在第 i//4 字节的第 2*(i%4) 位起
+"""
+import os
+import struct
+import zlib
+from array import array
+
+import numpy as np
+
+from algorithms.maze import DIRECTIONS, direction_of
+
+KEYFRAME_INTERVAL = 4096  # 关键帧间隔（步），必须是4的倍数
+
+MAGIC = b'TRAJ'
+FORMAT_VERSION = 1
+FLAG_COMPLEX = 1
+FLAG_SEED = 2  # 种子有效；没有种子时种子字段为0
+
+_HEADER = struct.Struct('<4sHHIIqiiIIQI16s16sI')
+
+# 每个字节里4步各方向出现的次数，定位时整字节查表
+_COUNTS = ((np.arange(256)[:, None] >> np.array([0, 2, 4, 6])) & 3)[:, :, None] == np.arange(4)
+_COUNTS = _COUNTS.sum(axis=1).astype(np.int64)
+
+
+class TrajectoryFileError(ValueError):
+    """文件不是轨迹文件、版本不支持或数据损坏"""
+
+
+def maze_identity(maze):
+    """轨迹所属迷宫的标识：尺寸、模式、种子、生成算法、出口和墙壁校验和"""
+    return {
+        'width': maze.width,
+        'height': maze.height,
+        'is_complex': maze.is_complex,
+        'seed': maze.seed,
+        'algorithm': maze.meta.get('algorithm', ''),
+        'exits': list(maze.exits),
+        'crc32': maze.derived('crc32', lambda: zlib.crc32(maze.buffer())),
+    }
+
+
+class Trajectory:
+    """一次运行的移动记录
+
+    只记录移到相邻格子的步，原地不动不算一步；跳到不相邻的格子时 record 返回False，
+    由调用方开始新的记录。kind 为运行模式（manual、wall_follow 等）。
+    """
+
+    def __init__(self, start, identity, kind='', interval=KEYFRAME_INTERVAL):
+        if interval <= 0 or interval % 4:
+            raise ValueError(f"关键帧间隔必须是4的正整数倍：{interval}")
+        self.start = tuple(start)
+        self.identity = identity
+        self.kind = kind
+        self.interval = interval
+        self.moves = bytearray()
+        self.keyframes = array('i', self.start)  # 第 k*interval 步之后的坐标，依次存 x, y
+        self.steps = 0
+        self.end = self.start
+
+    @classmethod
+    def from_indices(cls, maze, start, indices, kind='', interval=KEYFRAME_INTERVAL):
+        """由每步之后所在格子的一维下标（如 WallFollowResult.trajectory）整体构建"""
+        width = maze.width
+        cells = np.concatenate([[start[1] * width + start[0]], indices]).astype(np.int64)
+        delta = np.diff(cells)
+        moved = np.flatnonzero(delta)
+        delta = delta[moved]
+        codes = np.select([delta == -width, delta == 1, delta == width, delta == -1],
+                          [0, 1, 2, 3], -1)
+        if np.any(codes < 0):
+            raise ValueError("轨迹中有不相邻的跳跃")
+        trajectory = cls(start, maze_identity(maze), kind, interval)
+        steps = len(codes)
+        padded = np.zeros((steps + 3) // 4 * 4, dtype=np.uint8)
+        padded[:steps] = codes
+        padded = padded.reshape(-1, 4)
+        packed = padded[:, 0] | (padded[:, 1] << 2) | (padded[:, 2] << 4) | (padded[:, 3] << 6)
+        trajectory.moves = bytearray(packed.tobytes())
+        positions = np.concatenate([cells[:1], cells[1:][moved]])
+        y, x = np.divmod(positions[::interval], width)
+        trajectory.keyframes = array('i', np.column_stack([x, y]).astype(np.int32).tobytes())
+        trajectory.steps = steps
+        trajectory.end = maze.position(positions[-1])
+        return trajectory
+
+    def __len__(self):
+        return self.steps
+
+    @property
+    def nbytes(self):
+        return len(self.moves) + self.keyframes.itemsize * len(self.keyframes)
+
+    def append(self, direction):
+        """追加一步"""
+        steps = self.steps
+        if steps & 3:
+            self.moves[-1] |= direction << ((steps & 3) * 2)
+        else:
+            self.moves.append(direction)
+        dx, dy = DIRECTIONS[direction]
+        self.end = (self.end[0] + dx, self.end[1] + dy)
+        self.steps = steps = steps + 1
+        if not steps % self.interval:
+            self.keyframes.extend(self.end)
+
+    def record(self, pos):
+        """小车移到pos：相邻格子记一步，原位不记；不相邻时返回False"""
+        dx, dy = pos[0] - self.end[0], pos[1] - self.end[1]
+        if not dx and not dy:
+            return True
+        direction = direction_of(dx, dy)
+        if direction is None:
+            return False
+        self.append(direction)
+        return True
+
+    def direction(self, step):
+        """第step步（从0开始）的方向编号"""
+        return (self.moves[step >> 2] >> ((step & 3) * 2)) & 3
+
+    def position(self, step):
+        """走完前step步之后的坐标，0为起点；从最近的关键帧数起，最多查 interval/4 字节"""
+        if not 0 <= step <= self.steps:
+            raise ValueError(f"步数 {step} 超出范围 [0, {self.steps}]")
+        key = step // self.interval
+        x, y = self.keyframes[2 * key], self.keyframes[2 * key + 1]
+        first = key * self.interval
+        full = (step - first) >> 2
+        counts = [0, 0, 0, 0]
+        if full:
+            begin = first >> 2
+            block = np.frombuffer(bytes(self.moves[begin:begin + full]), dtype=np.uint8)
+            counts = _COUNTS[block].sum(axis=0).tolist()
+        for i in range(first + 4 * full, step):
+            counts[self.direction(i)] += 1
+        return (x + counts[1] - counts[3], y + counts[2] - counts[0])
+
+    def matches(self, maze):
+        """迷宫的尺寸、出口和墙壁是否与记录时相同"""
+        identity = maze_identity(maze)
+        return all(identity[key] == self.identity[key]
+                   for key in ('width', 'height', 'exits', 'crc32'))
+
+    def __repr__(self):
+        return f"Trajectory(kind={self.kind!r}, steps={self.steps}, nbytes={self.nbytes})"
+
+
+def save_trajectory(trajectory, path):
+    """把轨迹连同迷宫标识写入文件；先写临时文件再改名"""
+    identity = trajectory.identity
+    seed = identity['seed']
+    flags = (FLAG_COMPLEX if identity['is_complex'] else 0) | (FLAG_SEED if seed is not None else 0)
+    keyframes = np.frombuffer(trajectory.keyframes, dtype=np.int32).astype('<i4').tobytes()
+    moves = bytes(trajectory.moves)
+    exits = np.array(identity['exits'], dtype='<i4').reshape(-1, 2)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, flags, identity['width'], identity['height'],
+                          seed or 0, trajectory.start[0], trajectory.start[1], len(exits),
+                          identity['crc32'], trajectory.steps, trajectory.interval,
+                          identity['algorithm'].encode(), trajectory.kind.encode(),
+                          zlib.crc32(moves, zlib.crc32(keyframes)))
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(header)
+        f.write(exits.tobytes())
+        f.write(keyframes)
+        f.write(moves)
+    os.replace(temp, path)
+
+
+def load_trajectory(path):
+    """读取轨迹文件，返回 Trajectory，迷宫标识在 identity 中"""
+    with open(path, 'rb') as f:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            raise TrajectoryFileError(f"{path}: 文件太短")
+        (magic, version, flags, width, height, seed, start_x, start_y, num_exits,
+         maze_crc, steps, interval, algorithm, kind, crc) = _HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise TrajectoryFileError(f"{path}: 不是轨迹文件")
+        if version != FORMAT_VERSION:
+            raise TrajectoryFileError(f"{path}: 不支持的格式版本 {version}")
+        if interval <= 0 or interval % 4:
+            raise TrajectoryFileError(f"{path}: 关键帧间隔无效")
+        exits = np.frombuffer(f.read(8 * num_exits), dtype='<i4')
+        keyframe_bytes = 8 * (steps // interval + 1)
+        keyframes = f.read(keyframe_bytes)
+        moves = f.read((steps + 3) // 4)
+    if (len(exits) != 2 * num_exits or len(keyframes) != keyframe_bytes
+            or len(moves) != (steps + 3) // 4):
+        raise TrajectoryFileError(f"{path}: 数据不完整")
+    if zlib.crc32(moves, zlib.crc32(keyframes)) != crc:
+        raise TrajectoryFileError(f"{path}: 校验和不匹配，文件已损坏")
+
+    identity = {
+        'width': width,
+        'height': height,
+        'is_complex': bool(flags & FLAG_COMPLEX),
+        'seed': seed if flags & FLAG_SEED else None,
+        'algorithm': algorithm.rstrip(b'\0').decode(),
+        'exits': [tuple(pos) for pos in exits.reshape(-1, 2).tolist()],
+        'crc32': maze_crc,
+    }
+    trajectory = Trajectory((start_x, start_y), identity, kind.rstrip(b'\0').decode(), interval)
+    trajectory.keyframes = array('i', np.frombuffer(keyframes, dtype='<i4').astype(np.int32).tobytes())
+    trajectory.moves = bytearray(moves)
+    trajectory.steps = steps
+    trajectory.end = trajectory.position(steps)
+    return trajectory
@@ -0,0 +1,174 @@
+# algorithms/tree_index.py
+import time
+from array import array
+
+import numpy as np
+
+from algorithms.maze import WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT
+
+
+class TreeIndex:
+    """完美迷宫（生成树）上的最近公共祖先索引
+
+    从根做一次深度优先遍历，记下父节点、深度和先序编号；稀疏表保存先序区间内
+    父节点编号的最小值，于是任意两格的最近公共祖先、距离都是 O(1)，路线是 O(长度)。
+    迷宫里有环或不连通时构建会抛出 ValueError。
+    """
+
+    def __init__(self, maze, root=(0, 0)):
+        began = time.perf_counter()
+        self.maze = maze
+        width = maze.width
+        total = len(maze)
+        last_row = total - width
+        cells = maze.buffer()
+
+        parent = array('i', [-1]) * total
+        depth = array('i', [0]) * total
+        seen = bytearray(total)
+        order = array('i')  # 先序遍历顺序（欧拉序中每个格子第一次出现的位置）
+        visit = order.append
+
+        root = root[1] * width + root[0]
+        seen[root] = 1
+        stack = [root]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            current = pop()
+            visit(current)
+            cell = cells[current]
+            x = current % width
+            level = depth[current] + 1
+            for movable, nxt in (
+                (not cell & WALL_UP and current >= width, current - width),
+                (not cell & WALL_RIGHT and x < width - 1, current + 1),
+                (not cell & WALL_DOWN and current < last_row, current + width),
+                (not cell & WALL_LEFT and x > 0, current - 1),
+            ):
+                if not movable or nxt == parent[current]:
+                    continue
+                if seen[nxt]:
+                    raise ValueError("迷宫中有环，不是生成树")
+                seen[nxt] = 1
+                parent[nxt] = current
+                depth[nxt] = level
+                push(nxt)
+        if len(order) != total:
+            raise ValueError("迷宫不连通，不是生成树")
+
+        self.root = root
+        self.parent = parent
+        self.depth = depth
+        self.order = np.frombuffer(order, dtype=np.int32)
+        self.tin = np.empty(total, dtype=np.int32)  # 格子 -> 先序编号
+        self.tin[self.order] = np.arange(total, dtype=np.int32)
+        self._depth = np.frombuffer(depth, dtype=np.int32)
+        self._build_table(np.frombuffer(parent, dtype=np.int32))
+        self.elapsed = time.perf_counter() - began
+
+    def _build_table(self, parent):
+        """稀疏表第k层第i项 = 先序区间[i, i+2^k)内各格子父节点先序编号的最小值"""
+        total = len(self.order)
+        base = np.full(total, total, dtype=np.int32)
+        base[1:] = self.tin[parent[self.order[1:]]]
+        levels = max(1, total.bit_length())
+        table = np.empty((levels, total), dtype=np.int32)
+        table[0] = base
+        span = 1
+        for level in range(1, levels):
+            table[level] = table[level - 1]
+            np.minimum(table[level - 1][:-span], table[level - 1][span:], out=table[level][:-span])
+            span *= 2
+        self.table = table
+        # 区间长度 -> 所用层号
+        self.log = np.zeros(total + 1, dtype=np.int8)
+        self.log[2:] = np.floor(np.log2(np.arange(2, total + 1))).astype(np.int8)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes + self.log.nbytes + self.tin.nbytes + 3 * 4 * len(self.order)
+
+    def _index(self, pos):
+        return pos[1] * self.maze.width + pos[0]
+
+    def lca_index(self, a, b):
+        """两个一维下标的最近公共祖先下标"""
+        if a == b:
+            return a
+        left, right = int(self.tin[a]), int(self.tin[b])
+        if left > right:
+            left, right = right, left
+        left += 1
+        level = int(self.log[right - left + 1])
+        best = min(self.table[level, left], self.table[level, right - (1 << level) + 1])
+        return int(self.order[best])
+
+    def lca(self, a, b):
+        """两个格子在树上的最近公共祖先"""
+        return self.maze.position(self.lca_index(self._index(a), self._index(b)))
+
+    def distance(self, a, b):
+        """两个格子之间唯一路线的步数，O(1)"""
+        a, b = self._index(a), self._index(b)
+        depth = self.depth
+        return depth[a] + depth[b] - 2 * depth[self.lca_index(a, b)]
+
+    def distances(self, a, b):
+        """批量求距离：a、b为一维下标数组，全部用数组运算完成"""
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        tin_a, tin_b = self.tin[a], self.tin[b]
+        left = np.minimum(tin_a, tin_b) + 1
+        right = np.maximum(tin_a, tin_b)
+        same = a == b
+        left[same] = right[same]  # 相同格子随便查一个合法区间，结果最后置0
+        level = self.log[right - left + 1].astype(np.int64)
+        best = np.minimum(self.table[level, left], self.table[level, right - (1 << level) + 1])
+        best[same] = 0
+        ancestor = self.order[best]
+        result = self._depth[a] + self._depth[b] - 2 * self._depth[ancestor]
+        result[same] = 0
+        return result
+
+    def route(self, a, b):
+        """从a到b的唯一路线，O(路线长度)"""
+        a, b = self._index(a), self._index(b)
+        ancestor = self.lca_index(a, b)
+        parent = self.parent
+        up = []
+        while a != ancestor:
+            up.append(a)
+            a = parent[a]
+        down = []
+        while b != ancestor:
+            down.append(b)
+            b = parent[b]
+        up.append(ancestor)
+        up.extend(reversed(down))
+        return [self.maze.position(index) for index in up]
+
+    def nearest(self, pos, targets=None):
+        """targets（默认为出口）中离pos最近的一个及其距离"""
+        targets = self.maze.exits if targets is None else targets
+        best = None
+        for target in targets:
+            distance = self.distance(pos, target)
+            if best is None or distance < best[1]:
+                best = (tuple(target), distance)
+        return best
+
+
+def _build(maze):
+    try:
+        return TreeIndex(maze)
+    except ValueError:
+        return None
+
+
+def tree_index(maze):
+    """取出迷宫上缓存的树索引，没有时构建；迷宫不是生成树时返回None
+
+    迷宫被修改后随派生数据一起失效。
+    """
+    return maze.derived('tree_index', lambda: _build(maze))
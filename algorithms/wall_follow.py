@@ -1,26 +1,162 @@
 # algorithms/wall_follow.py
+import random
+import time
+from array import array
+
+import numpy as np
+
+from algorithms.maze import DIRECTIONS, WALL_BITS, WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT
+
+
+class WallFollowResult:
+    """一次完整沿墙行走的结果"""
+
+    def __init__(self, maze, trajectory, reached_exit, looped, direction, elapsed):
+        self.maze = maze
+        self.trajectory = trajectory  # 每一步之后所在格子的一维下标（原地掉头也算一步）
+        self.reached_exit = reached_exit
+        self.looped = looped  # 回到了走过的（格子, 方向）状态，永远到不了出口
+        self.direction = direction  # 结束时的朝向
+        self.elapsed = elapsed
+
+    @property
+    def steps(self):
+        return len(self.trajectory)
+
+    def position(self, step):
+        """第step步之后的坐标"""
+        return self.maze.position(self.trajectory[step])
+
+    def final_position(self, start):
+        return self.position(-1) if len(self.trajectory) else tuple(start)
+
+    def __repr__(self):
+        return (f"WallFollowResult(steps={self.steps}, reached_exit={self.reached_exit}, "
+                f"looped={self.looped})")
+
+
+PROGRESS_INTERVAL = 0xFFFF  # 每走这么多步回调一次进度
+
+
+def follow_walls(maze, start=None, direction=1, max_steps=None, progress=None):
+    """全速跑完右手沿墙的整条轨迹
+
+    右手法则是确定性的，下一步只取决于（格子, 朝向），所以用一张 4*格子数 的
+    位图记录走过的状态，重复出现即说明陷入循环，最多 4*格子数 步必然结束。
+    progress(已走步数, 预计步数) 定期被调用，抛出异常即可取消。
+    """
+    began = time.perf_counter()
+    start = maze.start if start is None else tuple(start)
+    width = maze.width
+    total = len(maze)
+
+    # 外圈强制补上墙（出口和入口的缺口通向迷宫外），循环里就不用判断边界
+    walls = maze.cells.copy()
+    walls[0, :] |= WALL_UP
+    walls[-1, :] |= WALL_DOWN
+    walls[:, 0] |= WALL_LEFT
+    walls[:, -1] |= WALL_RIGHT
+    walls = walls.tobytes()
+
+    goal = bytearray(total)
+    for x, y in maze.exits:
+        if maze.in_bounds(x, y):
+            goal[y * width + x] = 1
+
+    offsets = (-width, 1, width, -1)
+    bits = WALL_BITS
+    seen = bytearray(4 * total)
+    trajectory = array('i')
+    append = trajectory.append
+    limit = 4 * total + 1 if max_steps is None else max_steps
+
+    current = start[1] * width + start[0]
+    reached = looped = False
+    steps = 0
+    while steps < limit:
+        if goal[current]:
+            reached = True
+            break
+        state = current * 4 + direction
+        if seen[state]:
+            looped = True
+            break
+        if progress is not None and not steps & PROGRESS_INTERVAL:
+            progress(steps, 2 * total)  # 生成树上走遍全图约为2*格子数步
+        seen[state] = 1
+
+        cell = walls[current]
+        right = (direction + 1) & 3
+        if not cell & bits[right]:
+            direction = right
+        elif cell & bits[direction]:
+            left = (direction + 3) & 3
+            if not cell & bits[left]:
+                direction = left
+            else:
+                # 三面都是墙，原地掉头
+                direction = (direction + 2) & 3
+                append(current)
+                steps += 1
+                continue
+        current += offsets[direction]
+        append(current)
+        steps += 1
+    else:
+        reached = bool(goal[current])
+
+    trajectory = np.frombuffer(trajectory, dtype=np.int32) if trajectory else np.zeros(0, np.int32)
+    return WallFollowResult(maze, trajectory, reached, looped, direction,
+                            time.perf_counter() - began)
+
+
 class WallFollower:
-    def __init__(self, maze):
+    """右手沿墙走的无界面实现，方向编号与Maze一致：0:上, 1:右, 2:下, 3:左"""
+
+    def __init__(self, maze, start=None, direction=1):
         self.maze = maze
-        self.direction = 0  # 0:右,1:下,2:左,3:上
-        self.pos = (0, 0)
+        self.pos = tuple(start) if start is not None else maze.start
+        self.direction = direction
+        self.last_turn = 0  # 0:无转向, 1:左转, 2:右转
+        self.stuck_count = 0  # 卡住计数器
 
-    def next_move(self):
-        # 优先右转，其次直行，最后左转
-        right_dir = (self.direction - 1) % 4
+    def can_move(self, direction):
+        dx, dy = DIRECTIONS[direction]
+        return self.maze.can_move(self.pos[0], self.pos[1], dx, dy)
+
+    def step(self):
+        """走一步，返回是否移动了位置"""
+        right_dir = (self.direction + 1) % 4
         front_dir = self.direction
-        left_dir = (self.direction + 1) % 4
+        left_dir = (self.direction - 1) % 4
 
         if self.can_move(right_dir):
             self.direction = right_dir
-            return self.get_vector()
+            self.last_turn = 2
         elif self.can_move(front_dir):
-            return self.get_vector()
-        else:
+            self.last_turn = 0
+        elif self.can_move(left_dir):
             self.direction = left_dir
-            return (0, 0)  # 需要转向
+            self.last_turn = 1
+        else:
+            self.direction = (self.direction + 2) % 4
+            self.stuck_count += 1
+            if self.stuck_count > 3:
+                self.direction = random.randint(0, 3)
+                self.stuck_count = 0
+            return False
 
-    def can_move(self, direction):
-        x, y = self.pos
-        cell = self.maze[y][x]
-        return not (cell & (1 << direction))
+        dx, dy = DIRECTIONS[self.direction]
+        self.pos = (self.pos[0] + dx, self.pos[1] + dy)
+        self.stuck_count = 0
+        return True
+
+    def reached_exit(self):
+        return self.maze.is_exit(self.pos)
+
+    def run(self, max_steps=None):
+        """用快速引擎一直走到出口、陷入循环或用完步数，返回结果"""
+        result = follow_walls(self.maze, self.pos, self.direction, max_steps)
+        self.pos = result.final_position(self.pos)
+        self.direction = result.direction
+        return result
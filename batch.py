@@ -0,0 +1,5 @@
+# batch.py
+from algorithms.batch import main
+
+if __name__ == '__main__':
+    main()
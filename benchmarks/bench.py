@@ -0,0 +1,300 @@
+# benchmarks/bench.py
+"""热点路径基准测试：生成、求解、沿墙行走和离屏绘制
+
+用法示例：
+    python -m benchmarks.bench --sizes 15 64 256 --out results.json
+    python -m benchmarks.bench --sizes 4096 --cases flood_fill wall_follow
+
+默认尺寸不含 4096：该尺寸下树索引的稀疏表约 1.7 GB，需要时用 --sizes 显式指定，
+并只选内存够用的用例。
+
+基线与机器有关，仓库里不提交。先在同一台机器上保存一份，之后再与它比较：
+    python -m benchmarks.bench --save-baseline
+    python -m benchmarks.bench --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from algorithms import maze_gen
+from algorithms.auto_solver import SearchStats, astar, find_optimal_path
+from algorithms.flood_fill import FloodFill
+from algorithms.junction_graph import JunctionGraph, junction_graph
+from algorithms.trajectory import Trajectory
+from algorithms.tree_index import TreeIndex
+from algorithms.wall_follow import follow_walls
+
+DEFAULT_SIZES = [15, 64, 256, 1024]
+DEFAULT_SEEDS = [1, 2, 3]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+VIEWPORT = 1024  # 离屏绘制的视口边长（像素）
+QUERY_PAIRS = 1000000  # 树索引批量查询的格子对数
+SEEKS = 1000  # 轨迹随机定位的次数
+
+_mazes = {}
+
+
+def _maze(size, seed, mode='single'):
+    """同一(尺寸, 种子, 模式)的迷宫在各个用例之间复用"""
+    key = (size, seed, mode)
+    if key not in _mazes:
+        generate = maze_gen.generate_complex_maze if mode == 'complex' else maze_gen.generate_maze
+        _mazes[key] = generate(size, seed)
+    return _mazes[key]
+
+
+def bench_generate_maze(size, seed):
+    began = time.perf_counter()
+    maze = maze_gen.generate_maze(size, seed)
+    elapsed = time.perf_counter() - began
+    _mazes[(size, seed, 'single')] = maze
+    return elapsed, {'cells_per_second': len(maze) / elapsed}
+
+
+def _bench_algorithm(algorithm):
+    """某个生成算法的用例：生成单出口迷宫，记录每秒生成的格子数"""
+    def bench(size, seed):
+        began = time.perf_counter()
+        maze = maze_gen.generate_maze(size, seed, algorithm=algorithm)
+        elapsed = time.perf_counter() - began
+        return elapsed, {'cells_per_second': len(maze) / elapsed}
+    return bench
+
+
+def bench_generate_complex_maze(size, seed):
+    began = time.perf_counter()
+    maze = maze_gen.generate_complex_maze(size, seed)
+    elapsed = time.perf_counter() - began
+    _mazes[(size, seed, 'complex')] = maze
+    return elapsed, {'exits': len(maze.exits)}
+
+
+def bench_find_optimal_path(size, seed):
+    """路口图上的搜索；图预先建好，构建时间单独由 junction_graph 用例测量"""
+    maze = _maze(size, seed, 'complex')
+    junction_graph(maze)
+    stats = SearchStats()
+    began = time.perf_counter()
+    find_optimal_path(maze, maze.start, stats)
+    elapsed = time.perf_counter() - began
+    return elapsed, {'nodes_expanded': stats.nodes_expanded, 'path_length': stats.path_length}
+
+
+def bench_astar_cells(size, seed):
+    """逐格展开的A*，和路口图上的搜索对比展开节点数"""
+    maze = _maze(size, seed, 'complex')
+    stats = SearchStats()
+    began = time.perf_counter()
+    astar(maze, maze.start, maze.exits, stats)
+    elapsed = time.perf_counter() - began
+    return elapsed, {'nodes_expanded': stats.nodes_expanded, 'path_length': stats.path_length}
+
+
+def bench_flood_fill(size, seed):
+    """从所有出口求整张距离图，可与 find_optimal_path 逐个求路线比较"""
+    maze = _maze(size, seed, 'complex')
+    began = time.perf_counter()
+    fill = FloodFill(maze)
+    elapsed = time.perf_counter() - began
+    return elapsed, {'levels': fill.levels, 'reached': fill.reached,
+                     'cells_per_second': len(maze) / elapsed}
+
+
+def bench_junction_graph(size, seed):
+    """构建路口图（find_optimal_path 第一次调用时的额外开销）"""
+    maze = _maze(size, seed, 'complex')
+    began = time.perf_counter()
+    graph = JunctionGraph(maze)
+    elapsed = time.perf_counter() - began
+    return elapsed, {'nodes': graph.node_count, 'edges': graph.edge_count, 'cells': len(maze)}
+
+
+def bench_tree_index(size, seed):
+    """构建树索引，额外记录批量查询 QUERY_PAIRS 对格子距离的时间"""
+    maze = _maze(size, seed, 'single')
+    began = time.perf_counter()
+    index = TreeIndex(maze)
+    elapsed = time.perf_counter() - began
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, len(maze), QUERY_PAIRS)
+    b = rng.integers(0, len(maze), QUERY_PAIRS)
+    began = time.perf_counter()
+    index.distances(a, b)
+    return elapsed, {'query_time': time.perf_counter() - began, 'pairs': QUERY_PAIRS,
+                     'nbytes': index.nbytes}
+
+
+def bench_wall_follow(size, seed):
+    maze = _maze(size, seed, 'complex')
+    began = time.perf_counter()
+    result = follow_walls(maze)
+    elapsed = time.perf_counter() - began
+    return elapsed, {'steps': result.steps, 'looped': result.looped}
+
+
+def bench_trajectory(size, seed):
+    """把整条沿墙轨迹压成2位一步的记录，额外记录 SEEKS 次随机定位的时间"""
+    maze = _maze(size, seed, 'complex')
+    result = follow_walls(maze)
+    began = time.perf_counter()
+    trajectory = Trajectory.from_indices(maze, maze.start, result.trajectory, 'wall_follow')
+    elapsed = time.perf_counter() - began
+    steps = np.random.default_rng(seed).integers(0, trajectory.steps + 1, SEEKS).tolist()
+    began = time.perf_counter()
+    for step in steps:
+        trajectory.position(step)
+    return elapsed, {'steps': trajectory.steps, 'nbytes': trajectory.nbytes,
+                     'seek_time': (time.perf_counter() - began) / SEEKS}
+
+
+_app = None
+
+
+def _widget():
+    """创建离屏的MazeWidget；需要在导入Qt之前设置 QT_QPA_PLATFORM=offscreen"""
+    global _app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from widgets.maze_widget import MazeWidget
+    if _app is None:
+        _app = QApplication.instance() or QApplication([])
+    widget = MazeWidget(2, 30)
+    widget.resize(VIEWPORT, VIEWPORT)
+    return widget
+
+
+def bench_paint(size, seed):
+    """冷缓存下的一次完整绘制（图块全部重建），额外记录命中缓存后的重绘时间"""
+    from PyQt5.QtGui import QImage
+    maze = _maze(size, seed, 'complex')
+    widget = _widget()
+    widget.set_maze(maze)
+    widget.zoom = min(30.0, VIEWPORT / size)
+    if widget.zoom >= 4:
+        widget.zoom = float(int(widget.zoom))
+    widget.find_optimal_path()
+    image = QImage(VIEWPORT, VIEWPORT, QImage.Format_ARGB32_Premultiplied)
+
+    widget.invalidate_layer()
+    began = time.perf_counter()
+    widget.render(image)
+    elapsed = time.perf_counter() - began
+
+    began = time.perf_counter()
+    widget.render(image)
+    cached = time.perf_counter() - began
+    return elapsed, {'cached': cached, 'zoom': widget.zoom}
+
+
+CASES = {
+    'generate_maze': bench_generate_maze,
+    'generate_complex_maze': bench_generate_complex_maze,
+    **{f'generate_{name}': _bench_algorithm(name)
+       for name in maze_gen.ALGORITHMS if name != maze_gen.DEFAULT_ALGORITHM},
+    'junction_graph': bench_junction_graph,
+    'find_optimal_path': bench_find_optimal_path,
+    'astar_cells': bench_astar_cells,
+    'flood_fill': bench_flood_fill,
+    'tree_index': bench_tree_index,
+    'wall_follow': bench_wall_follow,
+    'trajectory': bench_trajectory,
+    'paint': bench_paint,
+}
+
+
+def run(cases, sizes, seeds):
+    """依次运行各个用例，逐条产出结果"""
+    for size in sizes:
+        for name in cases:
+            times = []
+            extra = {}
+            for seed in seeds:
+                elapsed, extra = CASES[name](size, seed)
+                times.append(elapsed)
+            yield {
+                'case': name,
+                'size': size,
+                'seeds': list(seeds),
+                'times': times,
+                'median': statistics.median(times),
+                'min': min(times),
+                'extra': extra,
+            }
+        # 大迷宫占内存，换尺寸时释放
+        _mazes.clear()
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, baseline, threshold):
+    """与基线比较最短耗时（比中位数更不受噪声影响），返回变慢超过阈值的用例"""
+    reference = {(item['case'], item['size']): item for item in baseline['results']}
+    regressions = []
+    for item in results:
+        base = reference.get((item['case'], item['size']))
+        if base is None:
+            continue
+        ratio = item['min'] / base['min'] if base['min'] else float('inf')
+        item['baseline_min'] = base['min']
+        item['ratio'] = ratio
+        if ratio > threshold:
+            regressions.append(item)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="迷宫热点路径基准测试")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seeds', type=int, nargs='+', default=DEFAULT_SEEDS)
+    parser.add_argument('--out', default=None, help="结果JSON文件，默认只打印")
+    parser.add_argument('--baseline', default=None, help="与该基线文件比较")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, default=None,
+                        help=f"把结果保存为基线（默认 {DEFAULT_BASELINE}）")
+    parser.add_argument('--threshold', type=float, default=1.2, help="最短耗时超过基线多少倍算退化")
+    args = parser.parse_args(argv)
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error(f"基线文件 {args.baseline} 不存在，请先用 --save-baseline 在本机生成")
+
+    results = []
+    for item in run(args.cases, args.sizes, args.seeds):
+        results.append(item)
+        print(f"{item['case']:<24} {item['size']:>6} median {item['median'] * 1000:10.2f} ms",
+              file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for item in results:
+            if 'ratio' in item:
+                flag = '  <-- 退化' if item in regressions else ''
+                print(f"{item['case']:<24} {item['size']:>6} x{item['ratio']:.2f}{flag}", file=sys.stderr)
+
+    report = {'environment': environment(), 'results': results}
+    text = json.dumps(report, indent=2)
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+    if not args.out:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
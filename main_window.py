@@ -1,10 +1,35 @@
 # main_window.py
+import functools
+import time
+
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout,
-    QHBoxLayout, QPushButton, QMessageBox
+    QHBoxLayout, QPushButton, QMessageBox, QLineEdit, QFileDialog, QSpinBox,
+    QProgressBar, QCheckBox, QComboBox, QSlider, QLabel
 )
-from PyQt5.QtCore import Qt, QTimer
-from widgets.maze_widget import MazeWidget
+from PyQt5.QtCore import Qt, QThreadPool
+from algorithms.auto_solver import SearchStats
+from algorithms.distance_field import distance_field
+from algorithms.dstar_lite import plan
+from algorithms.maze_file import MazeFileError, load_maze, save_maze
+from algorithms.trajectory import TrajectoryFileError, load_trajectory, save_trajectory
+from algorithms.wall_follow import follow_walls
+from widgets.maze_widget import MazeWidget, build_route_index
+from widgets.sim_clock import SimulationClock, FRAME_INTERVAL, MIN_SPEED, MAX_SPEED
+from widgets.workers import Task
+
+MAZE_FILE_FILTER = "迷宫文件 (*.maze)"
+TRAJECTORY_FILE_FILTER = "轨迹文件 (*.traj)"
+DEFAULT_SPEED = 10  # 自动模式默认每秒走的步数
+MANUAL_SPEED = 10   # 按住方向键时每秒走的格数
+# 生成算法在下拉框里的名称，键为 maze_gen.ALGORITHMS 中的算法名
+ALGORITHM_LABELS = {
+    'dfs': "深度优先",
+    'division': "递归分割",
+    'kruskal': "Kruskal",
+    'wilson': "Wilson",
+    'eller': "Eller",
+}
 
 
 class MainWindow(QMainWindow):
@@ -14,14 +39,19 @@ class MainWindow(QMainWindow):
         self.cell_size = 30
         self.init_ui()
         self.current_mode = None
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.auto_move)
+        # 自动模式的模拟时钟：按设定速度走步，每帧只重绘一次
+        self.clock = SimulationClock(self.run_simulation, self.speed_input.value(), self)
+        self.clock.frame.connect(lambda blend: self.on_frame('simulation', blend))
+        self.speed_input.valueChanged.connect(self.clock.set_speed)
         
-        # 手动模式的移动定时器
-        self.manual_timer = QTimer(self)
-        self.manual_timer.timeout.connect(self.manual_move)
-        self.manual_timer.setInterval(100)  # 100ms移动一次
+        # 手动模式按住方向键时的移动时钟
+        self.manual_clock = SimulationClock(self.run_manual, MANUAL_SPEED, self)
+        self.manual_clock.frame.connect(lambda blend: self.on_frame('manual_move', blend))
         self.current_direction = None  # 当前按下的方向键
+
+        # 生成和求解放到线程池里做，界面线程只接收结果
+        self.pool = QThreadPool.globalInstance()
+        self.task = None  # 正在进行的后台任务
         
         # 设置窗口接收键盘焦点
         self.setFocusPolicy(Qt.StrongFocus)
@@ -31,33 +61,93 @@ class MainWindow(QMainWindow):
         self.maze_widget = MazeWidget(self.maze_size, self.cell_size)
         
         # 连接到达终点信号
-        self.maze_widget.reached_end.connect(self.on_maze_completed)
+        # 排队连接：一帧内连续走多步时，等这一帧的步进和重绘收尾后再弹出提示
+        self.maze_widget.reached_end.connect(self.on_maze_completed, Qt.QueuedConnection)
+        self.maze_widget.loop_detected.connect(self.on_loop_detected, Qt.QueuedConnection)
+        self.maze_widget.generation_finished.connect(self.on_generation_finished)
 
         # 控制按钮
         self.btn_manual = QPushButton("手动模式 (1)")
         self.btn_auto = QPushButton("自动避障 (2)")
         self.btn_smart = QPushButton("智能求解 (3)")
+        self.btn_dynamic = QPushButton("动态障碍 (4)")
+        self.btn_swarm = QPushButton("车群模拟 (5)")
+        # 车群的车辆数
+        self.swarm_count = QSpinBox()
+        self.swarm_count.setRange(1, 100000)
+        self.swarm_count.setValue(1000)
+        self.swarm_count.setSuffix(" 辆")
+        # 模拟速度（步/秒）和平滑移动开关
+        self.speed_input = QSpinBox()
+        self.speed_input.setRange(MIN_SPEED, MAX_SPEED)
+        self.speed_input.setValue(DEFAULT_SPEED)
+        self.speed_input.setSuffix(" 步/秒")
+        self.smooth_check = QCheckBox("平滑移动")
         
         # 迷宫生成按钮
         self.btn_single = QPushButton("生成单出口迷宫")
         self.btn_complex = QPushButton("生成多出口迷宫")
+        # 种子输入框：填写种子可以复现迷宫，留空则随机
+        self.seed_input = QLineEdit()
+        self.seed_input.setPlaceholderText("种子（留空随机）")
+        self.seed_input.setMaximumWidth(140)
+        # 生成算法
+        self.algorithm_combo = QComboBox()
+        for name, label in ALGORITHM_LABELS.items():
+            self.algorithm_combo.addItem(label, name)
+        # 勾选后逐帧播放生成过程，而不是在后台一次生成
+        self.animate_check = QCheckBox("动画生成")
+        self.btn_save = QPushButton("保存迷宫")
+        self.btn_load = QPushButton("加载迷宫")
+
+        # 轨迹回放：拖动滑块定位到任意一步，回放速度与自动模式共用
+        self.btn_replay = QPushButton("回放轨迹")
+        self.replay_slider = QSlider(Qt.Horizontal)
+        self.replay_slider.setRange(0, 0)
+        self.replay_label = QLabel("0 / 0 步")
+        self.btn_save_trajectory = QPushButton("保存轨迹")
+        self.btn_load_trajectory = QPushButton("加载轨迹")
 
         # 模式按钮布局
         mode_layout = QHBoxLayout()
         mode_layout.addWidget(self.btn_manual)
         mode_layout.addWidget(self.btn_auto)
         mode_layout.addWidget(self.btn_smart)
+        mode_layout.addWidget(self.btn_dynamic)
+        mode_layout.addWidget(self.btn_swarm)
+        mode_layout.addWidget(self.swarm_count)
+        mode_layout.addWidget(self.speed_input)
+        mode_layout.addWidget(self.smooth_check)
 
         # 迷宫生成按钮布局
         maze_layout = QHBoxLayout()
         maze_layout.addWidget(self.btn_single)
         maze_layout.addWidget(self.btn_complex)
+        maze_layout.addWidget(self.algorithm_combo)
+        maze_layout.addWidget(self.seed_input)
+        maze_layout.addWidget(self.animate_check)
+        maze_layout.addWidget(self.btn_save)
+        maze_layout.addWidget(self.btn_load)
+
+        # 轨迹回放布局
+        replay_layout = QHBoxLayout()
+        replay_layout.addWidget(self.btn_replay)
+        replay_layout.addWidget(self.replay_slider)
+        replay_layout.addWidget(self.replay_label)
+        replay_layout.addWidget(self.btn_save_trajectory)
+        replay_layout.addWidget(self.btn_load_trajectory)
 
         # 主布局
         main_layout = QVBoxLayout()
         main_layout.addWidget(self.maze_widget)
+        # 后台任务的进度条，空闲时隐藏
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+        main_layout.addWidget(self.progress_bar)
         main_layout.addLayout(mode_layout)
         main_layout.addLayout(maze_layout)
+        main_layout.addLayout(replay_layout)
 
         container = QWidget()
         container.setLayout(main_layout)
@@ -67,21 +157,49 @@ class MainWindow(QMainWindow):
         self.btn_manual.clicked.connect(self.enter_manual_mode)
         self.btn_auto.clicked.connect(self.start_wall_follow)
         self.btn_smart.clicked.connect(self.start_auto_solve)
+        self.btn_dynamic.clicked.connect(self.start_dynamic_solve)
+        self.btn_swarm.clicked.connect(self.start_swarm)
         self.btn_single.clicked.connect(self.generate_single_maze)
         self.btn_complex.clicked.connect(self.generate_complex_maze)
+        self.btn_save.clicked.connect(self.save_maze)
+        self.btn_load.clicked.connect(self.load_maze)
+        self.btn_replay.clicked.connect(self.start_replay)
+        self.replay_slider.valueChanged.connect(self.on_scrub)
+        self.btn_save_trajectory.clicked.connect(self.save_trajectory)
+        self.btn_load_trajectory.clicked.connect(self.load_trajectory)
+        self.smooth_check.toggled.connect(self.maze_widget.set_smooth)
+        self.algorithm_combo.currentIndexChanged.connect(
+            lambda index: self.maze_widget.set_algorithm(self.algorithm_combo.itemData(index)))
 
     def keyPressEvent(self, event):
         """处理按键按下事件"""
+        key = event.key()
+        # F键：切换视口跟随小车
+        if key == Qt.Key_F:
+            self.maze_widget.set_follow(not self.maze_widget.follow_car)
+            return
+        # F3：开关性能叠加层；F4：导出性能数据
+        if key == Qt.Key_F3:
+            self.maze_widget.set_profiling(not self.maze_widget.profiler.enabled)
+            return
+        if key == Qt.Key_F4:
+            self.export_profile()
+            return
+        # R键：手动模式下开关到最近出口的路线提示
+        if key == Qt.Key_R and self.current_mode == 'manual':
+            self.maze_widget.set_show_route(not self.maze_widget.show_route)
+            self.prepare_route_hint()
+            return
+
         if self.current_mode != 'manual':
             return
 
-        key = event.key()
         # 如果是新的方向键被按下
         if key in [Qt.Key_Up, Qt.Key_Down, Qt.Key_Left, Qt.Key_Right]:
             self.current_direction = key
-            # 如果定时器未运行，启动它
-            if not self.manual_timer.isActive():
-                self.manual_timer.start()
+            # 如果时钟未运行，启动它
+            if not self.manual_clock.is_active():
+                self.manual_clock.start()
             # 立即移动一次，避免初次按下的延迟感
             self.manual_move()
 
@@ -94,12 +212,22 @@ class MainWindow(QMainWindow):
         # 如果释放的是当前方向键，停止移动
         if key == self.current_direction:
             self.current_direction = None
-            self.manual_timer.stop()
+            self.manual_clock.stop()
+
+    def on_frame(self, name, blend):
+        """模拟时钟每帧的回调：记录帧间隔抖动，更新小车的插值位置"""
+        if self.maze_widget.profiler.enabled:
+            self.maze_widget.profiler.record_tick(name, FRAME_INTERVAL)
+        self.maze_widget.set_blend(blend)
+        self.update_replay_slider()
+
+    def run_manual(self, count):
+        return self.maze_widget.run_steps(self.manual_move, count)
 
     def manual_move(self):
-        """手动模式下的移动处理"""
+        """手动模式下的移动处理；松开方向键或到达终点时返回False"""
         if self.current_direction is None:
-            return
+            return False
 
         dx, dy = 0, 0
         if self.current_direction == Qt.Key_Up:
@@ -114,84 +242,390 @@ class MainWindow(QMainWindow):
         if self.maze_widget.can_move(dx, dy):
             current_x, current_y = self.maze_widget.car_pos
             self.maze_widget.car_pos = (current_x + dx, current_y + dy)
-            self.maze_widget.update()
+            self.maze_widget.update_route_hint()
             
             # 检查是否到达终点
-            if self.maze_widget.car_pos == (self.maze_size-1, self.maze_size-1):
-                self.manual_timer.stop()
+            if self.maze_widget.maze.is_exit(self.maze_widget.car_pos):
+                self.manual_clock.stop()
                 self.current_direction = None
                 self.maze_widget.reached_end.emit()
+                return False
+        return True
 
     def enter_manual_mode(self):
         """进入手动模式"""
+        self.cancel_task()
         self.current_mode = 'manual'
-        self.timer.stop()
-        self.manual_timer.stop()
+        self.clock.stop()
+        self.manual_clock.stop()
         self.current_direction = None
+        self.maze_widget.stop_recording()
         self.maze_widget.reset_car()
         self.maze_widget.stop_wall_follow()
+        self.maze_widget.stop_dynamic_solve()
+        self.maze_widget.stop_swarm()
+        self.maze_widget.stop_generation()
+        self.maze_widget.update_route_hint()
+        self.prepare_route_hint()
+        self.maze_widget.start_recording('manual')
         print("进入手动模式")
 
+    def prepare_route_hint(self):
+        """路线提示已打开但索引还没建好时在后台构建，建好后再显示"""
+        widget = self.maze_widget
+        if not widget.show_route or widget.route_index is not None:
+            return
+        maze = widget.maze
+        self.run_in_background("路线索引", build_route_index,
+                               lambda index: widget.set_route_index(maze, index), maze)
+
     def start_wall_follow(self):
-        """开始自动避障模式"""
+        """开始自动避障模式：后台算出整条沿墙轨迹后开始回放"""
         self.current_mode = 'wall_follow'
-        self.manual_timer.stop()
+        self.clock.stop()
+        self.manual_clock.stop()
         self.current_direction = None
+        self.maze_widget.stop_recording()
         self.maze_widget.reset_car()
-        self.maze_widget.start_wall_follow()
-        self.timer.start(100)  # 每100ms移动一次
+        self.maze_widget.stop_wall_follow()
+        self.maze_widget.stop_dynamic_solve()
+        self.maze_widget.stop_swarm()
+        self.maze_widget.stop_generation()
+        self.run_in_background("沿墙行走", follow_walls, self.on_wall_follow_ready,
+                               self.maze_widget.maze, self.maze_widget.car_pos)
         print("进入自动避障模式")
 
+    def on_wall_follow_ready(self, result):
+        self.maze_widget.start_wall_follow(result)
+        self.maze_widget.start_recording('wall_follow')
+        self.clock.start()
+
     def start_auto_solve(self):
-        """开始智能求解模式"""
+        """开始智能求解模式：后台建好出口距离场后开始移动"""
         self.current_mode = 'auto_solve'
-        self.manual_timer.stop()
+        self.clock.stop()
+        self.manual_clock.stop()
         self.current_direction = None
+        self.maze_widget.stop_recording()
+        self.maze_widget.stop_wall_follow()
+        self.maze_widget.stop_dynamic_solve()
+        self.maze_widget.stop_swarm()
+        self.maze_widget.stop_generation()
         self.maze_widget.start_auto_solve()  # 重置路径
-        self.timer.start(100)  # 控制移动速度
+        stats = SearchStats()
+        self.run_in_background("求解", distance_field, lambda field: self.on_field_ready(stats),
+                               self.maze_widget.maze, stats)
         print("进入智能求解模式")
 
+    def on_field_ready(self, stats):
+        if stats.nodes_expanded:  # 距离场是这次新建的
+            self.maze_widget.solver_stats = stats
+            if self.maze_widget.profiler.enabled:
+                self.maze_widget.profiler.record_solver(stats, stats.elapsed)
+        self.maze_widget.start_recording('auto_solve')
+        self.clock.start()
+
+    def start_swarm(self):
+        """开始车群模拟：沿墙、最短路和随机三种车同时行驶"""
+        self.current_mode = 'swarm'
+        self.clock.stop()
+        self.manual_clock.stop()
+        self.current_direction = None
+        self.maze_widget.stop_wall_follow()
+        self.maze_widget.stop_dynamic_solve()
+        self.maze_widget.stop_swarm()
+        self.maze_widget.stop_generation()
+        self.maze_widget.stop_recording()
+        # 最短路车辆共用出口距离场，先在后台建好
+        self.run_in_background("准备车群", distance_field, lambda field: self.on_swarm_ready(),
+                               self.maze_widget.maze)
+        print(f"进入车群模拟模式，共 {self.swarm_count.value()} 辆车")
+
+    def on_swarm_ready(self):
+        self.maze_widget.start_swarm(self.swarm_count.value(), seed=self.current_seed())
+        self.clock.start()
+
+    def start_dynamic_solve(self):
+        """开始动态障碍模式：后台完成第一次规划后开始移动，右键点击切换墙，小车增量重规划"""
+        self.current_mode = 'dynamic'
+        self.clock.stop()
+        self.manual_clock.stop()
+        self.current_direction = None
+        self.maze_widget.stop_recording()
+        self.maze_widget.stop_wall_follow()
+        self.maze_widget.stop_dynamic_solve()
+        self.maze_widget.stop_swarm()
+        self.maze_widget.stop_generation()
+        maze = self.maze_widget.maze
+        if maze.is_exit(self.maze_widget.car_pos):
+            self.maze_widget.car_pos = maze.start
+        stats = SearchStats()
+        self.run_in_background("规划", plan, lambda planner: self.on_planner_ready(planner, stats),
+                               maze, self.maze_widget.car_pos, stats)
+        print("进入动态障碍模式，右键点击格子边缘切换墙")
+
+    def on_planner_ready(self, planner, stats):
+        self.maze_widget.start_dynamic_solve(planner, stats)
+        self.maze_widget.start_recording('dynamic')
+        self.clock.start()
+
+    def run_simulation(self, count):
+        """模拟时钟的回调：一帧内连续走count步，只重绘一次"""
+        return self.maze_widget.run_steps(self.auto_move, count)
+
     def auto_move(self):
-        """自动移动的定时器回调函数"""
+        """自动模式的一步，模拟结束时返回False"""
         if self.current_mode == 'wall_follow':
-            self.maze_widget.wall_follow_step()
+            return self.maze_widget.wall_follow_step()
         elif self.current_mode == 'auto_solve':
-            self.maze_widget.auto_solve_step()
+            return self.maze_widget.auto_solve_step()
+        elif self.current_mode == 'dynamic':
+            return self.maze_widget.dynamic_step()
+        elif self.current_mode == 'replay':
+            if not self.maze_widget.playback_step():
+                self.update_replay_slider()  # 时钟停止后不再有帧回调
+                return False
+            return True
+        elif self.current_mode == 'swarm':
+            if not self.maze_widget.swarm_step():
+                print("车群全部到达出口")
+                return False
+            return True
+        return False
+
+    def export_profile(self):
+        """把性能数据导出为JSON和CSV文件"""
+        base = time.strftime('profile_%Y%m%d_%H%M%S')
+        self.maze_widget.profiler.export_json(base + '.json')
+        self.maze_widget.profiler.export_csv(base + '.csv')
+        print(f"性能数据已导出到 {base}.json / {base}.csv")
 
     def on_maze_completed(self):
         """迷宫完成时的回调函数"""
-        self.timer.stop()
-        self.manual_timer.stop()
+        self.clock.stop()
+        self.manual_clock.stop()
         self.current_direction = None
+        self.maze_widget.stop_recording()
+        self.update_replay_slider()
         QMessageBox.information(self, "提示", "恭喜！小车已到达终点！")
 
-    def generate_single_maze(self):
-        """生成单出口迷宫"""
-        # 停止所有定时器
-        self.timer.stop()
-        self.manual_timer.stop()
+    def on_loop_detected(self):
+        """沿墙行走陷入循环时的回调函数"""
+        self.clock.stop()
+        self.maze_widget.stop_recording()
+        self.update_replay_slider()
+        QMessageBox.information(self, "提示", "小车沿墙绕圈，无法到达任何出口！")
+
+    def current_seed(self):
+        """读取种子输入框，留空或不是整数时返回None（随机生成）"""
+        text = self.seed_input.text().strip()
+        try:
+            return int(text) if text else None
+        except ValueError:
+            return None
+
+    def stop_all(self):
+        """停止所有定时器和模式"""
+        self.clock.stop()
+        self.manual_clock.stop()
         self.current_direction = None
-        
-        # 重置为单出口迷宫
-        self.maze_widget.reset_to_single_exit()
-        
+        self.current_mode = None
+        self.maze_widget.stop_wall_follow()
+        self.maze_widget.stop_dynamic_solve()
+        self.maze_widget.stop_swarm()
+        self.maze_widget.stop_generation()
+        self.maze_widget.stop_recording()
+
+    def generate_single_maze(self):
+        """生成单出口迷宫：在后台生成，完成后切换；勾选动画时逐帧播放"""
+        self.stop_all()
+        if self.animate_check.isChecked():
+            self.cancel_task()
+            self.maze_widget.start_generation('single', self.current_seed())
+            return
+        self.run_in_background("生成迷宫", self.maze_widget.generate_maze, self.on_single_generated,
+                               self.current_seed())
+
+    def on_single_generated(self, maze):
+        self.maze_widget.set_maze(maze)
         # 显示提示信息
-        QMessageBox.information(self, "提示", "已生成单出口迷宫！\n出口位置在右下角。")
+        QMessageBox.information(self, "提示", f"已生成单出口迷宫！\n出口位置在右下角。\n种子：{self.maze_widget.maze.seed}")
 
     def generate_complex_maze(self):
-        """生成复杂迷宫"""
-        # 停止所有定时器
-        self.timer.stop()
-        self.manual_timer.stop()
-        self.current_direction = None
-        
-        # 生成新的复杂迷宫
-        self.maze_widget.maze = self.maze_widget.generate_complex_maze()
-        self.maze_widget.car_pos = (0, 0)
-        self.maze_widget.optimal_path = []
-        self.maze_widget.path_index = 0
-        self.maze_widget.update()
-        
+        """生成复杂迷宫：在后台生成，完成后切换；勾选动画时逐帧播放"""
+        self.stop_all()
+        if self.animate_check.isChecked():
+            self.cancel_task()
+            self.maze_widget.start_generation('complex', self.current_seed())
+            return
+        self.run_in_background("生成迷宫", self.maze_widget.generate_complex_maze,
+                               self.on_complex_generated, self.current_seed())
+
+    def on_complex_generated(self, maze):
+        self.maze_widget.set_maze(maze)
         # 显示提示信息
         num_exits = len(self.maze_widget.exits)
-        QMessageBox.information(self, "提示", f"已生成带有{num_exits}个出口的复杂迷宫！\n蓝色方块标记为出口位置。")
+        QMessageBox.information(self, "提示", f"已生成带有{num_exits}个出口的复杂迷宫！\n蓝色方块标记为出口位置。\n种子：{self.maze_widget.maze.seed}")
+
+    def on_generation_finished(self, maze):
+        if maze.is_complex:
+            self.on_complex_generated(maze)
+        else:
+            self.on_single_generated(maze)
+
+    def save_maze(self):
+        """把当前迷宫保存为压缩二进制文件"""
+        path, _ = QFileDialog.getSaveFileName(self, "保存迷宫", "", MAZE_FILE_FILTER)
+        if not path:
+            return
+        if not path.endswith('.maze'):
+            path += '.maze'
+        save_maze(self.maze_widget.maze, path)
+        print(f"迷宫已保存到 {path}")
+
+    def load_maze(self):
+        """内存映射方式加载迷宫文件"""
+        path, _ = QFileDialog.getOpenFileName(self, "加载迷宫", "", MAZE_FILE_FILTER)
+        if not path:
+            return
+        try:
+            maze = load_maze(path)
+        except (OSError, MazeFileError) as e:
+            QMessageBox.warning(self, "提示", f"无法加载迷宫：{e}")
+            return
+        self.cancel_task()
+        self.stop_all()
+        self.maze_widget.set_maze(maze)
+
+    def start_replay(self):
+        """回放最近一次运行或加载的轨迹：从滑块位置开始，放到头时从起点重来"""
+        trajectory = self.maze_widget.trajectory
+        if trajectory is None or not trajectory.steps:
+            QMessageBox.information(self, "提示", "还没有可以回放的轨迹！")
+            return
+        step = self.replay_slider.value() if self.current_mode == 'replay' else 0
+        self.cancel_task()
+        self.stop_all()
+        self.current_mode = 'replay'
+        self.maze_widget.seek(0 if step >= trajectory.steps else step)
+        self.update_replay_slider()
+        self.clock.start()
+        print(f"回放{trajectory.kind}轨迹，共 {trajectory.steps} 步")
+
+    def on_scrub(self, step):
+        """拖动滑块：进入回放模式并定位到该步；正在回放时继续往下放"""
+        if self.maze_widget.trajectory is None:
+            return
+        if self.current_mode != 'replay':
+            self.cancel_task()
+            self.stop_all()
+            self.current_mode = 'replay'
+        self.maze_widget.seek(step)
+        self.replay_label.setText(f"{step} / {self.maze_widget.trajectory.steps} 步")
+
+    def update_replay_slider(self):
+        """滑块范围跟随记录中的轨迹长度；回放时滑块跟随回放进度"""
+        trajectory = self.maze_widget.trajectory
+        steps = trajectory.steps if trajectory is not None else 0
+        step = self.maze_widget.playback_index if self.current_mode == 'replay' else steps
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setRange(0, steps)
+        self.replay_slider.setValue(step)
+        self.replay_slider.blockSignals(False)
+        self.replay_label.setText(f"{step} / {steps} 步")
+
+    def save_trajectory(self):
+        """把轨迹连同迷宫标识保存为文件"""
+        trajectory = self.maze_widget.trajectory
+        if trajectory is None:
+            QMessageBox.information(self, "提示", "还没有可以保存的轨迹！")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "保存轨迹", "", TRAJECTORY_FILE_FILTER)
+        if not path:
+            return
+        if not path.endswith('.traj'):
+            path += '.traj'
+        save_trajectory(trajectory, path)
+        print(f"轨迹已保存到 {path}，共 {trajectory.steps} 步，{trajectory.nbytes} 字节")
+
+    def load_trajectory(self):
+        """加载轨迹文件；当前迷宫不是记录时的迷宫时，按种子和算法在后台重新生成"""
+        path, _ = QFileDialog.getOpenFileName(self, "加载轨迹", "", TRAJECTORY_FILE_FILTER)
+        if not path:
+            return
+        try:
+            trajectory = load_trajectory(path)
+        except (OSError, TrajectoryFileError) as e:
+            QMessageBox.warning(self, "提示", f"无法加载轨迹：{e}")
+            return
+        self.cancel_task()
+        self.stop_all()
+        if trajectory.matches(self.maze_widget.maze):
+            self.on_trajectory_maze_ready(trajectory, self.maze_widget.maze)
+            return
+        identity = trajectory.identity
+        if (identity['seed'] is None or identity['width'] != identity['height']
+                or identity['algorithm'] not in ALGORITHM_LABELS):
+            QMessageBox.warning(self, "提示", "轨迹不属于当前迷宫，请先加载记录时的迷宫文件。")
+            return
+        mode = 'complex' if identity['is_complex'] else 'single'
+        generate = functools.partial(self.maze_widget.maze_cache.get, algorithm=identity['algorithm'])
+        self.run_in_background("生成迷宫", generate,
+                               lambda maze: self.on_trajectory_maze_ready(trajectory, maze),
+                               identity['width'], mode, identity['seed'])
+
+    def on_trajectory_maze_ready(self, trajectory, maze):
+        if not trajectory.matches(maze):
+            QMessageBox.warning(self, "提示", "迷宫的墙壁或出口与记录时不同（可能改过墙），无法回放。")
+            return
+        if maze is not self.maze_widget.maze:
+            self.maze_widget.set_maze(maze)
+        self.maze_widget.trajectory = trajectory
+        self.current_mode = 'replay'
+        self.maze_widget.seek(0)
+        self.update_replay_slider()
+        print(f"已加载{trajectory.kind}轨迹，共 {trajectory.steps} 步")
+
+    def run_in_background(self, label, fn, on_done, *args):
+        """在线程池里运行 fn(*args, progress=...)，取消仍在进行的任务
+
+        结果通过信号回到界面线程再交给 on_done；进度显示在进度条上。
+        """
+        self.cancel_task()
+        task = Task(fn, *args)
+        task.signals.progress.connect(self.progress_bar.setValue)
+        task.signals.finished.connect(lambda result: self.on_task_finished(task, on_done, result))
+        task.signals.failed.connect(lambda message: self.on_task_failed(task, message))
+        self.task = task
+        self.progress_bar.setFormat(f"{label} %p%")
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.pool.start(task)
+
+    def cancel_task(self):
+        """取消正在进行的后台任务；它的结果到达时会被丢弃"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.progress_bar.hide()
+
+    def on_task_finished(self, task, on_done, result):
+        if task is not self.task:
+            return  # 已被取消或被新任务替换
+        self.task = None
+        self.progress_bar.hide()
+        on_done(result)
+
+    def on_task_failed(self, task, message):
+        if task is not self.task:
+            return
+        self.task = None
+        self.progress_bar.hide()
+        print(message)
+        QMessageBox.warning(self, "提示", "后台任务出错，详细信息见控制台输出。")
+
+    def closeEvent(self, event):
+        """关闭窗口时取消后台任务并等它结束"""
+        self.cancel_task()
+        self.pool.waitForDone()
+        super().closeEvent(event)
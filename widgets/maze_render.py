@@ -0,0 +1,141 @@
+# widgets/maze_render.py
+import numpy as np
+from PyQt5.QtGui import QImage
+
+from algorithms.maze import WALL_UP, WALL_RIGHT, WALL_DOWN, WALL_LEFT
+
+WALL_WIDTH = 2  # 墙的像素宽度，与原来 QPen(Qt.black, 2) 一致
+
+
+def boundary_masks(cells, x0=0, y0=0, x1=None, y1=None):
+    """计算[x0, x1) x [y0, y1)范围内的墙，相邻格子共用的墙只算一次
+
+    返回 (横墙, 竖墙) 两个布尔数组：横墙形状为 (行数+1, 列数)，
+    第i行表示第y0+i条水平边界；竖墙形状为 (行数, 列数+1)。
+    """
+    height, width = cells.shape
+    x1 = width if x1 is None else x1
+    y1 = height if y1 is None else y1
+    block = cells[y0:y1, x0:x1]
+
+    # 横墙：第y条水平边界位于第y-1行和第y行之间
+    horizontal = np.zeros((y1 - y0 + 1, x1 - x0), dtype=bool)
+    horizontal[:-1] |= (block & WALL_UP) != 0
+    horizontal[1:] |= (block & WALL_DOWN) != 0
+    if y0 > 0:
+        horizontal[0] |= (cells[y0 - 1, x0:x1] & WALL_DOWN) != 0
+    if y1 < height:
+        horizontal[-1] |= (cells[y1, x0:x1] & WALL_UP) != 0
+
+    # 竖墙：第x条竖直边界位于第x-1列和第x列之间
+    vertical = np.zeros((y1 - y0, x1 - x0 + 1), dtype=bool)
+    vertical[:, :-1] |= (block & WALL_LEFT) != 0
+    vertical[:, 1:] |= (block & WALL_RIGHT) != 0
+    if x0 > 0:
+        vertical[:, 0] |= (cells[y0:y1, x0 - 1] & WALL_RIGHT) != 0
+    if x1 < width:
+        vertical[:, -1] |= (cells[y0:y1, x1] & WALL_LEFT) != 0
+    return horizontal, vertical
+
+
+def _stamp_rows(mask, boundaries, cell_size):
+    """把水平边界画进像素掩码：每条边界占 WALL_WIDTH 行，两端各多出1像素补齐拐角"""
+    rows, cols = mask.shape
+    expanded = np.repeat(boundaries, cell_size, axis=1)
+    expanded = np.pad(expanded, ((0, 0), (1, 1)))
+    expanded = expanded[:, :-2] | expanded[:, 1:-1] | expanded[:, 2:]
+    expanded = expanded[:, :cols]
+    positions = np.arange(len(boundaries)) * cell_size
+    for offset in range(-(WALL_WIDTH // 2), WALL_WIDTH - WALL_WIDTH // 2):
+        target = positions + offset
+        valid = (target >= 0) & (target < rows)
+        mask[target[valid]] |= expanded[valid]
+
+
+def wall_mask(cells, cell_size, x0=0, y0=0, x1=None, y1=None):
+    """把一块区域的墙光栅化成像素掩码，全部用数组运算完成，不逐条调用drawLine"""
+    horizontal, vertical = boundary_masks(cells, x0, y0, x1, y1)
+    rows = vertical.shape[0] * cell_size
+    cols = horizontal.shape[1] * cell_size
+    mask = np.zeros((rows, cols), dtype=bool)
+    _stamp_rows(mask, horizontal, cell_size)
+    _stamp_rows(mask.T, vertical.T, cell_size)
+    return mask
+
+
+def alpha_image(mask):
+    """把布尔掩码转换成Alpha8图像：True为不透明黑色，其余透明"""
+    rows, cols = mask.shape
+    stride = (cols + 3) & ~3  # 每行按4字节对齐
+    data = np.zeros((rows, stride), dtype=np.uint8)
+    data[:, :cols] = mask
+    data *= 255
+    image = QImage(data.data, cols, rows, stride, QImage.Format_Alpha8)
+    return image.copy()  # 复制一份，脱离numpy缓冲区
+
+
+def _cell_mask(positions, width, height, x0=0, y0=0):
+    """把坐标列表转换成区域内的布尔掩码"""
+    mask = np.zeros((height, width), dtype=bool)
+    if len(positions):
+        points = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        xs = points[:, 0] - x0
+        ys = points[:, 1] - y0
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        mask[ys[inside], xs[inside]] = True
+    return mask
+
+
+def _argb_image(argb):
+    height, width = argb.shape
+    image = QImage(argb.data, width, height, width * 4, QImage.Format_ARGB32)
+    return image.copy()
+
+
+def cell_overlay(positions, color, width, height, x0=0, y0=0):
+    """每格一个像素的半透明覆盖层，绘制时整体放大到格子尺寸，一次drawImage提交"""
+    argb = np.zeros((height, width), dtype=np.uint32)
+    argb[_cell_mask(positions, width, height, x0, y0)] = color.rgba()
+    return _argb_image(argb)
+
+
+# 缩得很小时按墙的数量给格子着色：墙越多越暗
+_LOD_SHADES = np.array([240 - 40 * bin(mask).count('1') for mask in range(16)], dtype=np.uint32)
+
+
+def lod_image(cells, overlays=(), x0=0, y0=0, x1=None, y1=None):
+    """细节层级栅格：每个格子一个像素，直接由墙壁掩码查表得到
+
+    overlays 为 [(坐标列表, QColor), ...]，按顺序用各自的透明度混合上去。
+    """
+    height, width = cells.shape
+    x1 = width if x1 is None else x1
+    y1 = height if y1 is None else y1
+    shade = _LOD_SHADES[cells[y0:y1, x0:x1] & 15]
+    rgb = np.stack([shade, shade, shade], axis=-1).astype(np.float32)
+    for positions, color in overlays:
+        mask = _cell_mask(positions, x1 - x0, y1 - y0, x0, y0)
+        alpha = color.alpha() / 255.0
+        rgb[mask] = rgb[mask] * (1 - alpha) + np.array(
+            [color.red(), color.green(), color.blue()], dtype=np.float32) * alpha
+    rgb = rgb.astype(np.uint32)
+    argb = 0xFF000000 | (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    return _argb_image(np.ascontiguousarray(argb, dtype=np.uint32))
+
+
+def swarm_image(xs, ys, colors, width, height, x0=0, y0=0, scale=1):
+    """把集群里所有车一次画进一张ARGB图像，绘制时整体放大到格子尺寸
+
+    xs、ys 为格子坐标数组，colors 为每辆车的ARGB颜色数组。scale大于2时每格
+    scale x scale 像素，车只占中间一块，放大后不会盖住格子边上的墙。
+    """
+    argb = np.zeros((height * scale, width * scale), dtype=np.uint32)
+    xs = np.asarray(xs) - x0
+    ys = np.asarray(ys) - y0
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    xs, ys, colors = xs[inside] * scale, ys[inside] * scale, np.asarray(colors)[inside]
+    margin = scale // 4
+    for dy in range(margin, scale - margin):
+        for dx in range(margin, scale - margin):
+            argb[ys + dy, xs + dx] = colors
+    return _argb_image(argb)
@@ -1,488 +1,797 @@
 # widgets/maze_widget.py
+import math
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QColor, QPen
-from PyQt5.QtCore import Qt, pyqtSignal
-import random
-from collections import deque
-import heapq
+from PyQt5.QtGui import QPainter, QColor, QPixmap
+from PyQt5.QtCore import Qt, QPoint, QRect, QRectF, QSize, QTimer, pyqtSignal
+
+from algorithms.maze_cache import MazeCache
+from algorithms.maze_gen import ALGORITHMS, CarveStream, DEFAULT_ALGORITHM, apply_events
+from algorithms.auto_solver import SearchStats
+from algorithms.distance_field import DistanceField, distance_field
+from algorithms.dstar_lite import plan
+from algorithms.maze import DIRECTIONS
+from algorithms.swarm import Swarm, WALL_FOLLOWER, FIELD_FOLLOWER, RANDOM_WALKER
+from algorithms.trajectory import Trajectory, maze_identity
+from algorithms.tree_index import tree_index
+from algorithms.wall_follow import follow_walls
+from widgets.maze_render import wall_mask, alpha_image, cell_overlay, lod_image, swarm_image
+from widgets.profiler import Profiler
+
+EXIT_COLOR = QColor(0, 0, 255, 100)  # 半透明的蓝色
+PATH_COLOR = QColor(0, 255, 0, 64)
+LOD_ZOOM = 4         # 每格像素数低于该值时改用每格一个像素的栅格
+TILE_PIXELS = 512    # 细节图块的大致像素边长
+LOD_TILE_CELLS = 256  # 栅格图块的格子边长
+MAX_TILES = 256      # 图块LRU缓存容量
+MAX_ZOOM = 64
+GENERATION_INTERVAL = 16  # 生成动画每帧间隔（毫秒）
+GENERATION_FRAMES = 120   # 生成动画大约播放的帧数，决定每帧应用多少挖墙事件
+# 集群里各种车的颜色（ARGB）
+SWARM_COLORS = np.zeros(3, dtype=np.uint32)
+SWARM_COLORS[WALL_FOLLOWER] = 0xFFFF8000   # 橙色：沿墙
+SWARM_COLORS[FIELD_FOLLOWER] = 0xFF00A000  # 绿色：最短路
+SWARM_COLORS[RANDOM_WALKER] = 0xFFA000FF   # 紫色：随机
+
+
+def build_route_index(maze, progress=None):
+    """路线提示用的索引：生成树上是树索引（O(1)找最近出口），否则是出口距离场
+
+    可以在工作线程里调用，结果缓存在迷宫的派生数据里。
+    """
+    index = tree_index(maze)
+    if index is None:
+        index = distance_field(maze, progress=progress)
+    return index
 
 
 class MazeWidget(QWidget):
     # 添加到达终点的信号
     reached_end = pyqtSignal()
+    # 沿墙行走陷入循环、永远到不了出口
+    loop_detected = pyqtSignal()
+    # 生成动画播放完毕，参数为生成好的迷宫
+    generation_finished = pyqtSignal(object)
 
     def __init__(self, size, cell_size):
         super().__init__()
         self.size = size
-        self.maze = self.generate_maze()
-        self.car_pos = (0, 0)
-        self.cell_size = cell_size
-        self.setFixedSize(size*cell_size, size*cell_size)
-        # 添加方向状态
-        self.current_direction = 1  # 0:上, 1:右, 2:下, 3:左
-        self.last_turn = 0  # 0:无转向, 1:左转, 2:右转
-        self.stuck_count = 0  # 卡住计数器
+        self.cell_size = cell_size  # 初始缩放：每格像素数
+        self.zoom = float(cell_size)  # 当前每格像素数
+        self.origin = [0.0, 0.0]  # 视口左上角在迷宫像素坐标中的位置
+        self.follow_car = True  # 小车离开视口时自动跟随
+        self._tiles = OrderedDict()  # 图块LRU缓存：(层级, 图块x, 图块y) -> QPixmap
+        self._overlays = None  # 出口和路径覆盖层
+        self._drag_start = None
+        # 按种子缓存迷宫；设置 MAZE_CACHE_DIR 时同时存到磁盘
+        self.maze_cache = MazeCache(store_dir=os.environ.get('MAZE_CACHE_DIR'))
+        self.algorithm = DEFAULT_ALGORITHM  # 生成算法，见 maze_gen.ALGORITHMS
+        self._maze = self.generate_maze()
+        self._car_pos = (0, 0)
+        self._optimal_path = []  # 存储最优路径
+        self.setMinimumSize(200, 200)
+        self.wall_follow_result = None  # 预先算好的沿墙轨迹
+        self.replay_index = 0  # 轨迹回放到第几步
         self.is_running = False  # 添加运行状态标志
-        self.optimal_path = []  # 存储最优路径
         self.path_index = 0     # 当前路径索引
-        self.exits = [(self.size-1, self.size-1)]  # 默认出口
-        self.is_complex_maze = False
-
-    def generate_maze(self):
-        """生成单出口迷宫"""
-        self.is_complex_maze = False
-        # 初始化迷宫，所有格子都是墙
-        maze = [[15 for _ in range(self.size)] for _ in range(self.size)]
-        
-        def carve_path(x, y):
-            visited = [[False for _ in range(self.size)] for _ in range(self.size)]
-            visited[y][x] = True
-            stack = [(x, y)]
-            
-            while stack:
-                current_x, current_y = stack[-1]
-                
-                directions = []
-                possible_dirs = [
-                    (0, -1, 1, 4),  # 上
-                    (1, 0, 2, 8),   # 右
-                    (0, 1, 4, 1),   # 下
-                    (-1, 0, 8, 2)   # 左
-                ]
-                
-                random.shuffle(possible_dirs)
-                
-                for dx, dy, wall, next_wall in possible_dirs:
-                    next_x, next_y = current_x + dx, current_y + dy
-                    if (0 <= next_x < self.size and 0 <= next_y < self.size and 
-                        not visited[next_y][next_x]):
-                        directions.append((dx, dy, wall, next_wall, next_x, next_y))
-                
-                if directions:
-                    dx, dy, wall, next_wall, next_x, next_y = directions[0]
-                    maze[current_y][current_x] &= ~wall
-                    maze[next_y][next_x] &= ~next_wall
-                    visited[next_y][next_x] = True
-                    stack.append((next_x, next_y))
-                else:
-                    stack.pop()
-        
-        # 从起点开始生成迷宫
-        carve_path(0, 0)
-        
-        # 设置单一出口
-        self.exits = [(self.size-1, self.size-1)]
-        
-        # 确保出口是通的
-        maze[0][0] &= ~8  # 移除起点左墙
-        maze[self.size-1][self.size-1] &= ~2  # 移除终点右墙
-        
-        return maze
-
-    def generate_complex_maze(self):
-        """生成多出口的复杂迷宫"""
-        self.is_complex_maze = True
-        # 初始化迷宫，所有格子都是墙
-        maze = [[15 for _ in range(self.size)] for _ in range(self.size)]
-        
-        # 使用改进的DFS生成基本迷宫结构
-        def carve_path(x, y):
-            visited = [[False for _ in range(self.size)] for _ in range(self.size)]
-            visited[y][x] = True
-            stack = [(x, y)]
-            
-            while stack:
-                current_x, current_y = stack[-1]
-                
-                directions = []
-                possible_dirs = [
-                    (0, -1, 1, 4),  # 上
-                    (1, 0, 2, 8),   # 右
-                    (0, 1, 4, 1),   # 下
-                    (-1, 0, 8, 2)   # 左
-                ]
-                
-                random.shuffle(possible_dirs)
-                
-                for dx, dy, wall, next_wall in possible_dirs:
-                    next_x, next_y = current_x + dx, current_y + dy
-                    if (0 <= next_x < self.size and 0 <= next_y < self.size and 
-                        not visited[next_y][next_x]):
-                        directions.append((dx, dy, wall, next_wall, next_x, next_y))
-                
-                if directions:
-                    dx, dy, wall, next_wall, next_x, next_y = directions[0]
-                    maze[current_y][current_x] &= ~wall
-                    maze[next_y][next_x] &= ~next_wall
-                    visited[next_y][next_x] = True
-                    stack.append((next_x, next_y))
-                else:
-                    stack.pop()
-        
-        # 从起点开始生成迷宫
-        carve_path(0, 0)
-        
-        # 生成3-4个出口
-        num_exits = random.randint(3, 4)
-        self.exits = []
-        
-        # 定义最小距离
-        min_distance = self.size // 3  # 确保出口之间至少间隔迷宫大小的1/3
-        
-        # 可能的出口位置（边界格子）
-        possible_exits = []
-        
-        # 添加右边界的格子
-        for y in range(self.size):
-            possible_exits.append((self.size-1, y))
-        
-        # 添加下边界的格子
-        for x in range(self.size):
-            possible_exits.append((x, self.size-1))
-        
-        # 移除起点附近的格子（扩大范围）
-        possible_exits = [(x, y) for x, y in possible_exits 
-                         if abs(x) + abs(y) > self.size//2]
-        
-        def manhattan_distance(pos1, pos2):
-            return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
-        
-        # 选择出口，确保它们之间的距离
-        selected_exits = []
-        while len(selected_exits) < num_exits and possible_exits:
-            # 随机选择一个可能的出口
-            candidate = random.choice(possible_exits)
-            
-            # 检查与已选出口的距离
-            is_valid = True
-            for existing_exit in selected_exits:
-                if manhattan_distance(candidate, existing_exit) < min_distance:
-                    is_valid = False
-                    break
-            
-            if is_valid:
-                selected_exits.append(candidate)
-            
-            # 从可能的出口中移除这个候选
-            possible_exits.remove(candidate)
-            
-            # 同时移除候选附近的点（为了加快处理速度）
-            possible_exits = [pos for pos in possible_exits 
-                            if manhattan_distance(pos, candidate) >= min_distance]
-        
-        # 如果没有找到足够的合适出口，适当减小距离要求
-        while len(selected_exits) < num_exits and min_distance > 2:
-            min_distance -= 1
-            # 重新生成可能的出口
-            possible_exits = []
-            for y in range(self.size):
-                possible_exits.append((self.size-1, y))
-            for x in range(self.size):
-                possible_exits.append((x, self.size-1))
-            possible_exits = [(x, y) for x, y in possible_exits 
-                            if abs(x) + abs(y) > self.size//2]
-            
-            # 继续选择出口
-            for pos in possible_exits:
-                if len(selected_exits) >= num_exits:
-                    break
-                    
-                is_valid = True
-                for existing_exit in selected_exits:
-                    if manhattan_distance(pos, existing_exit) < min_distance:
-                        is_valid = False
-                        break
-                
-                if is_valid:
-                    selected_exits.append(pos)
-        
-        self.exits = selected_exits
-        
-        # 确保每个出口都可以到达
-        for exit_x, exit_y in self.exits:
-            # 打通到出口的墙
-            if exit_x == self.size-1:  # 右边界
-                maze[exit_y][exit_x] &= ~2
-            if exit_y == self.size-1:  # 下边界
-                maze[exit_y][exit_x] &= ~4
-        
-        # 确保入口是通的
-        maze[0][0] &= ~8  # 移除起点左墙
-        
-        return maze
+        self.solver_stats = SearchStats()  # 最近一次求解的统计
+        self.show_route = False  # 手动模式下实时显示到最近出口的路线
+        self.route_index = None  # 路线提示所用的索引，后台建好后由 set_route_index 交给界面
+        self.planner = None  # 动态障碍模式的增量规划器
+        self.walls_editable = False  # 右键改墙只在动态障碍模式下生效，其他模式不会跟着重新规划
+        self.replan_log = []  # 每次改墙后的重规划开销
+        self._maze_owned = False  # 迷宫来自缓存时与缓存共享，改墙前先复制一份
+        self.swarm = None  # 多车集群模拟
+        self.smooth = False  # 在两格之间插值显示小车
+        self._from_pos = None  # 插值的起点：最近一步之前的位置
+        self._blend = 1.0  # 从 _from_pos 走向 car_pos 的比例
+        self._batching = False  # 连续执行多步时只记位置，结束后统一重绘
+        self.trajectory = None  # 最近一次运行（或从文件加载）的轨迹，回放和保存都用它
+        self.recording = False  # 小车移动时是否记入 trajectory
+        self.playback_index = 0  # 轨迹回放到第几步
+        self.generation = None  # 正在播放的生成事件流
+        self._generation_events = None
+        self._generation_timer = QTimer(self)
+        self._generation_timer.setInterval(GENERATION_INTERVAL)
+        self._generation_timer.timeout.connect(self.generation_step)
+        # 性能记录和屏幕叠加层，关闭时几乎没有开销
+        self.profiler = Profiler()
+        self._overlay_timer = QTimer(self)
+        self._overlay_timer.timeout.connect(lambda: self.update(self.overlay_rect()))
+
+    @property
+    def maze(self):
+        return self._maze
+
+    @maze.setter
+    def maze(self, maze):
+        self._maze = maze
+        self.invalidate_layer()
+
+    @property
+    def car_pos(self):
+        return self._car_pos
+
+    @car_pos.setter
+    def car_pos(self, pos):
+        """移动小车时只重绘旧位置和新位置两个格子"""
+        old = self._car_pos
+        self._car_pos = tuple(pos)
+        if self.recording and not self.trajectory.record(self._car_pos):
+            # 跳到了不相邻的格子，从这里重新记录
+            self.trajectory = Trajectory(self._car_pos, maze_identity(self.maze), self.trajectory.kind)
+        if self._batching:
+            if self.profiler.enabled:
+                self.profiler.record_step()
+            return
+        if self._from_pos is not None:
+            self.update(self.cell_rect(*self._from_pos))  # 插值中的小车跨在上一格和旧位置之间
+            self._from_pos = None
+        if old != self._car_pos:
+            self.update(self.cell_rect(*old))
+            self.update(self.cell_rect(*self._car_pos))
+            if self.follow_car:
+                self.ensure_car_visible()
+            if self.profiler.enabled:
+                self.profiler.record_step()
+
+    @property
+    def optimal_path(self):
+        return self._optimal_path
+
+    @optimal_path.setter
+    def optimal_path(self, path):
+        """只丢弃新旧路径不一致的格子所在的图块；手动模式每走一步路线提示通常只差一两格"""
+        changed = set(map(tuple, self._optimal_path)).symmetric_difference(map(tuple, path))
+        self._optimal_path = path
+        self._overlays = None
+        if changed:
+            self.invalidate_cells(list(changed))
+
+    @property
+    def exits(self):
+        return self.maze.exits
+
+    @property
+    def is_complex_maze(self):
+        return self.maze.is_complex
+
+    def generate_maze(self, seed=None, progress=None):
+        """生成单出口迷宫，同一种子直接取缓存；可以在工作线程里调用"""
+        return self.maze_cache.get(self.size, 'single', seed, progress=progress, algorithm=self.algorithm)
+
+    def generate_complex_maze(self, seed=None, num_exits=None, progress=None):
+        """生成多出口的复杂迷宫，同一种子直接取缓存；可以在工作线程里调用"""
+        return self.maze_cache.get(self.size, 'complex', seed, num_exits, progress, self.algorithm)
+
+    def set_algorithm(self, algorithm):
+        """选择之后生成迷宫所用的算法"""
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"未知的生成算法：{algorithm}")
+        self.algorithm = algorithm
+
+    def set_maze(self, maze):
+        """切换到新的迷宫并重置小车和路径"""
+        self.maze = maze
+        self._maze_owned = False
+        self.planner = None
+        self.walls_editable = False
+        self.route_index = None
+        self.swarm = None
+        self.recording = False
+        self.trajectory = None
+        self.car_pos = maze.start
+        self.optimal_path = []
+        self.path_index = 0
+        self.is_running = False
+
+    def sizeHint(self):
+        return QSize(min(self.maze.width * self.cell_size, 900),
+                     min(self.maze.height * self.cell_size, 900))
+
+    def cell_rect(self, x, y):
+        """格子在窗口中的像素区域"""
+        zoom = self.zoom
+        return QRectF(x * zoom - self.origin[0], y * zoom - self.origin[1],
+                      zoom, zoom).toAlignedRect()
+
+    def cell_at(self, point):
+        """窗口坐标对应的格子"""
+        return (int((point.x() + self.origin[0]) // self.zoom),
+                int((point.y() + self.origin[1]) // self.zoom))
+
+    def invalidate_layer(self):
+        """迷宫或路径变化后丢弃所有图块，下次绘制时按需重建"""
+        self._tiles.clear()
+        self._overlays = None
+        self.update()
+
+    def invalidate_cells(self, positions):
+        """只丢弃覆盖这些格子的图块（各个缩放层级都算），并重绘它们的外接区域
+
+        positions 可以是坐标列表，也可以是 (n, 2) 的数组；每个层级的图块编号一次算出。
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        if not len(positions):
+            return
+        xs, ys = positions[:, 0], positions[:, 1]
+        touched = {}  # 缩放层级 -> 被改动的图块编号集合
+        for key in list(self._tiles):
+            level = key[0]
+            if level not in touched:
+                count = LOD_TILE_CELLS if level == 0 else max(1, TILE_PIXELS // level)
+                tiles = np.unique(np.column_stack((xs // count, ys // count)), axis=0)
+                touched[level] = set(map(tuple, tiles.tolist()))
+            if key[1:] in touched[level]:
+                del self._tiles[key]
+        rect = self.cell_rect(int(xs.min()), int(ys.min())).united(
+            self.cell_rect(int(xs.max()), int(ys.max())))
+        self.update(rect.adjusted(-2, -2, 2, 2))
+
+    def overlays(self):
+        """出口标记和最优路径两个覆盖层，图块渲染时共用"""
+        if self._overlays is None:
+            self._overlays = []
+            # 坐标预先转换为数组，各个图块只做向量化筛选
+            if self.is_complex_maze:
+                self._overlays.append((np.array(self.exits), EXIT_COLOR))
+            if self.optimal_path:
+                self._overlays.append((np.array(self.optimal_path), PATH_COLOR))
+        return self._overlays
+
+    def tile_cells(self):
+        """当前缩放下一个图块的格子边长"""
+        if self.zoom < LOD_ZOOM:
+            return LOD_TILE_CELLS
+        return max(1, TILE_PIXELS // int(round(self.zoom)))
+
+    def tile(self, tx, ty):
+        """取出缓存的图块，没有时渲染并放入LRU"""
+        lod = self.zoom < LOD_ZOOM
+        level = 0 if lod else int(round(self.zoom))
+        key = (level, tx, ty)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+        tile = self.render_tile(tx, ty, level)
+        self._tiles[key] = tile
+        if len(self._tiles) > MAX_TILES:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def render_tile(self, tx, ty, level):
+        """渲染一个图块：level为0时是每格一像素的栅格，否则为每格level像素的墙壁图"""
+        count = self.tile_cells()
+        x0, y0 = tx * count, ty * count
+        x1 = min(x0 + count, self.maze.width)
+        y1 = min(y0 + count, self.maze.height)
+        if level == 0:
+            return QPixmap.fromImage(lod_image(self.maze.cells, self.overlays(), x0, y0, x1, y1))
+
+        tile = QPixmap((x1 - x0) * level, (y1 - y0) * level)
+        tile.fill(Qt.transparent)
+        painter = QPainter(tile)
+        # 共用的墙只算一次，整块墙壁掩码一次提交
+        painter.drawImage(0, 0, alpha_image(wall_mask(self.maze.cells, level, x0, y0, x1, y1)))
+        # 出口标记和最优路径：每格一个像素的覆盖层整体放大
+        for positions, color in self.overlays():
+            painter.drawImage(tile.rect(), cell_overlay(positions, color, x1 - x0, y1 - y0, x0, y0))
+        painter.end()
+        return tile
 
     def paintEvent(self, event):
+        began = time.perf_counter() if self.profiler.enabled else None
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+        zoom = self.zoom
+        count = self.tile_cells()
+        span = count * zoom
+
+        # 只绘制与脏区域相交的图块
+        dirty = event.rect()
+        left = max(0, int((dirty.left() + self.origin[0]) // span))
+        top = max(0, int((dirty.top() + self.origin[1]) // span))
+        right = min((self.maze.width - 1) // count, int((dirty.right() + self.origin[0]) // span))
+        bottom = min((self.maze.height - 1) // count, int((dirty.bottom() + self.origin[1]) // span))
+        for ty in range(top, bottom + 1):
+            for tx in range(left, right + 1):
+                tile = self.tile(tx, ty)
+                x = tx * span - self.origin[0]
+                y = ty * span - self.origin[1]
+                if zoom < LOD_ZOOM:
+                    cells_w = min(count, self.maze.width - tx * count)
+                    cells_h = min(count, self.maze.height - ty * count)
+                    painter.drawPixmap(QRectF(x, y, cells_w * zoom, cells_h * zoom),
+                                       tile, QRectF(tile.rect()))
+                else:
+                    painter.drawPixmap(QPoint(int(round(x)), int(round(y))), tile)
 
-        # 绘制迷宫
-        if self.maze:
-            for y in range(len(self.maze)):
-                for x in range(len(self.maze[y])):
-                    self.draw_cell(painter, x, y)
-
-        # 绘制出口标记
-        if self.is_complex_maze:
-            painter.setPen(Qt.NoPen)
-            painter.setBrush(QColor(0, 0, 255, 100))  # 半透明的蓝色
-            for exit_x, exit_y in self.exits:
-                painter.drawRect(
-                    exit_x * self.cell_size,
-                    exit_y * self.cell_size,
-                    self.cell_size,
-                    self.cell_size
-                )
-
-        # 如果有最优路径，绘制路径
-        if self.optimal_path:
-            painter.setPen(Qt.NoPen)
-            painter.setBrush(QColor(0, 255, 0, 64))
-            for x, y in self.optimal_path:
-                painter.drawRect(
-                    x * self.cell_size,
-                    y * self.cell_size,
-                    self.cell_size,
-                    self.cell_size
-                )
+        if self.swarm is not None:
+            self.draw_swarm(painter)
 
         # 绘制小车
-        self.draw_car(painter)
-
-    def draw_cell(self, painter, x, y):
-        cell = self.maze[y][x]
-        x_pix = x * self.cell_size
-        y_pix = y * self.cell_size
-
-        pen = QPen(Qt.black, 2)
-        painter.setPen(pen)
-
-        if cell & 1:  # 上墙
-            painter.drawLine(x_pix, y_pix, x_pix+self.cell_size, y_pix)
-        if cell & 2:  # 右墙
-            painter.drawLine(x_pix+self.cell_size, y_pix,
-                             x_pix+self.cell_size, y_pix+self.cell_size)
-        if cell & 4:  # 下墙
-            painter.drawLine(x_pix, y_pix+self.cell_size,
-                             x_pix+self.cell_size, y_pix+self.cell_size)
-        if cell & 8:  # 左墙
-            painter.drawLine(x_pix, y_pix, x_pix, y_pix+self.cell_size)
+        painter.setRenderHint(QPainter.Antialiasing)
+        if dirty.intersects(self.car_rect().toAlignedRect()):
+            self.draw_car(painter)
+
+        if began is not None:
+            if dirty.intersects(self.overlay_rect()):
+                self.draw_profiler(painter)
+            self.profiler.record_frame(began)
+
+    def set_profiling(self, enabled):
+        """开关性能记录和屏幕叠加层"""
+        self.profiler.set_enabled(enabled)
+        if enabled:
+            self._overlay_timer.start(500)
+        else:
+            self._overlay_timer.stop()
+        self.update()
+
+    def overlay_rect(self):
+        return QRect(8, 8, 420, 18 * len(self.profiler.overlay_lines()) + 10)
+
+    def draw_profiler(self, painter):
+        """在左上角画出性能叠加层"""
+        rect = self.overlay_rect()
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 160))
+        painter.drawRect(rect)
+        painter.setPen(Qt.white)
+        for row, line in enumerate(self.profiler.overlay_lines()):
+            painter.drawText(rect.left() + 6, rect.top() + 18 * (row + 1), line)
+
+    def draw_swarm(self, painter):
+        """集群里的车一次画完：可见范围内每格一个像素的图像整体放大"""
+        zoom = self.zoom
+        x0 = max(0, int(self.origin[0] // zoom))
+        y0 = max(0, int(self.origin[1] // zoom))
+        x1 = min(self.maze.width, int((self.origin[0] + self.width()) // zoom) + 1)
+        y1 = min(self.maze.height, int((self.origin[1] + self.height()) // zoom) + 1)
+        if x1 <= x0 or y1 <= y0:
+            return
+        xs, ys = self.swarm.coordinates()
+        scale = 1 if zoom < LOD_ZOOM else 4
+        image = swarm_image(xs, ys, SWARM_COLORS[self.swarm.kinds], x1 - x0, y1 - y0, x0, y0, scale)
+        painter.drawImage(QRectF(x0 * zoom - self.origin[0], y0 * zoom - self.origin[1],
+                                 (x1 - x0) * zoom, (y1 - y0) * zoom), image, QRectF(image.rect()))
+
+    def car_rect(self):
+        """小车所在的像素区域；开启平滑移动时在上一格和当前格之间插值"""
+        x, y = self.car_pos
+        if self.smooth and self._from_pos is not None:
+            fx, fy = self._from_pos
+            if abs(x - fx) + abs(y - fy) == 1:
+                t = self._blend
+                x, y = fx + (x - fx) * t, fy + (y - fy) * t
+        zoom = self.zoom
+        return QRectF(x * zoom - self.origin[0], y * zoom - self.origin[1], zoom, zoom)
 
     def draw_car(self, painter):
-        x = self.car_pos[0] * self.cell_size + self.cell_size//4
-        y = self.car_pos[1] * self.cell_size + self.cell_size//4
-        size = self.cell_size//2
+        rect = self.car_rect()
+        margin = rect.width() / 4
+        painter.setPen(Qt.NoPen)
         painter.setBrush(QColor(255, 0, 0))
-        painter.drawEllipse(x, y, size, size)
+        painter.drawEllipse(rect.adjusted(margin, margin, -margin, -margin))
 
-    def reset_car(self):
-        """重置小车位置"""
-        self.car_pos = (0, 0)
+    def clamp_origin(self):
+        """限制平移范围，不让视口移出迷宫；迷宫比视口小时靠左上角显示"""
+        max_x = max(self.maze.width * self.zoom - self.width(), 0)
+        max_y = max(self.maze.height * self.zoom - self.height(), 0)
+        self.origin[0] = min(max(self.origin[0], 0), max_x)
+        self.origin[1] = min(max(self.origin[1], 0), max_y)
+
+    def center_on(self, x, y):
+        """把格子(x, y)移动到视口中央"""
+        self.origin[0] = (x + 0.5) * self.zoom - self.width() / 2
+        self.origin[1] = (y + 0.5) * self.zoom - self.height() / 2
+        self.clamp_origin()
         self.update()
 
-    def can_move(self, dx, dy):
-        """检查是否可以移动到指定方向"""
-        new_x = self.car_pos[0] + dx
-        new_y = self.car_pos[1] + dy
-        
-        if not (0 <= new_x < self.size and 0 <= new_y < self.size):
-            return False
+    def ensure_car_visible(self):
+        """小车靠近视口边缘时重新居中"""
+        margin = 2 * self.zoom
+        rect = self.cell_rect(*self.car_pos)
+        if (rect.left() < margin or rect.top() < margin or
+                rect.right() > self.width() - margin or rect.bottom() > self.height() - margin):
+            self.center_on(*self.car_pos)
 
-        current_cell = self.maze[self.car_pos[1]][self.car_pos[0]]
-        if dx == 1 and current_cell & 2:  # 右墙
-            return False
-        if dx == -1 and current_cell & 8:  # 左墙
+    def set_follow(self, follow):
+        """开关小车跟随，打开时立即居中到小车"""
+        self.follow_car = follow
+        if follow:
+            self.center_on(*self.car_pos)
+
+    def zoom_at(self, factor, anchor):
+        """以窗口坐标anchor为中心缩放"""
+        min_zoom = min(self.width() / self.maze.width, self.height() / self.maze.height, 1.0) / 2
+        zoom = min(max(self.zoom * factor, min_zoom), MAX_ZOOM)
+        if zoom >= LOD_ZOOM:
+            zoom = float(round(zoom))  # 细节图块使用整数像素的格子
+        cell_x = (anchor.x() + self.origin[0]) / self.zoom
+        cell_y = (anchor.y() + self.origin[1]) / self.zoom
+        self.zoom = zoom
+        self.origin[0] = cell_x * zoom - anchor.x()
+        self.origin[1] = cell_y * zoom - anchor.y()
+        self.clamp_origin()
+        self.update()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            factor = math.pow(1.25, steps)
+            if factor > 1 and self.zoom >= LOD_ZOOM:
+                factor = max(factor, (self.zoom + 1) / self.zoom)  # 保证取整后仍能放大
+            self.zoom_at(factor, event.pos())
+
+    def mousePressEvent(self, event):
+        if event.button() in (Qt.LeftButton, Qt.MiddleButton):
+            self._drag_start = (event.pos(), list(self.origin))
+        elif event.button() == Qt.RightButton:
+            self.toggle_wall_at(event.pos())
+
+    def toggle_wall_at(self, point):
+        """右键点击：切换离点击位置最近的那面墙"""
+        if not self.walls_editable or self.generation is not None:
+            return
+        fx = (point.x() + self.origin[0]) / self.zoom
+        fy = (point.y() + self.origin[1]) / self.zoom
+        x, y = int(fx), int(fy)
+        if not self.maze.in_bounds(x, y):
+            return
+        fx -= x
+        fy -= y
+        # 到上、右、下、左四条边的距离
+        direction = min(range(4), key=lambda d: (fy, 1 - fx, 1 - fy, fx)[d])
+        self.toggle_wall(x, y, direction)
+
+    def toggle_wall(self, x, y, direction):
+        """切换一面内墙；外圈的墙不允许打开"""
+        self.set_wall(x, y, direction, not self.maze.wall(x, y) & (1 << direction))
+
+    def set_wall(self, x, y, direction, closed=True):
+        """改墙并只重绘受影响的图块；动态障碍模式下增量重规划"""
+        dx, dy = DIRECTIONS[direction]
+        other = (x + dx, y + dy)
+        if not self.maze.in_bounds(*other):
+            return
+        if not self._maze_owned:
+            # 缓存里的迷宫可能被别处共用，也可能是只读的内存映射
+            self._maze = self.maze.copy()
+            self._maze_owned = True
+            if self.planner is not None:
+                self.planner.maze = self._maze
+        self.maze.set_wall(x, y, direction, closed)
+        self.route_index = None
+        self.invalidate_cells([(x, y), other])
+        if self.planner is not None:
+            self.planner.update_walls([(x, y), other])
+            self.replan()
+
+    def start_generation(self, mode='single', seed=None, num_exits=None, events_per_frame=None):
+        """逐帧播放迷宫生成：每帧从事件流取一块挖墙事件，只重绘改动的格子
+
+        播放完毕后迷宫放进缓存并发出 generation_finished；同一种子和直接生成的结果相同。
+        """
+        self.stop_generation()
+        if events_per_frame is None:
+            events_per_frame = max(1, self.size * self.size // GENERATION_FRAMES)
+        self.generation = CarveStream(self.size, mode, seed, num_exits, chunk_size=events_per_frame,
+                                      algorithm=self.algorithm)
+        self._generation_events = iter(self.generation)
+        self.set_maze(self.generation.maze())
+        self._maze_owned = True
+        self._generation_timer.start()
+
+    def stop_generation(self):
+        """中途停止生成动画，迷宫停留在已挖开的状态"""
+        self._generation_timer.stop()
+        self.generation = None
+        self._generation_events = None
+
+    def generation_step(self):
+        """应用下一块挖墙事件；事件流结束时收尾"""
+        if self.generation is None:
+            return
+        try:
+            events = next(self._generation_events)
+        except StopIteration:
+            self.finish_generation()
+            return
+        touched = apply_events(self.maze.cells, events)
+        self.maze.touch()  # 墙壁就地改动，已缓存的派生数据作废
+        ys, xs = np.divmod(touched, self.maze.width)
+        self.invalidate_cells(np.column_stack((xs, ys)))
+
+    def finish_generation(self):
+        stream = self.generation
+        self.stop_generation()
+        maze = self.maze
+        maze.exits = stream.exits
+        maze.touch()
+        key = self.maze_cache.key(self.size, stream.mode, stream.seed, stream.num_exits, stream.algorithm)
+        self.maze_cache.put(key, maze)
+        self.set_maze(maze)  # 缓存里的迷宫是共享的，之后改墙时先复制
+        self.generation_finished.emit(maze)
+
+    def start_swarm(self, count, kinds=(WALL_FOLLOWER, FIELD_FOLLOWER, RANDOM_WALKER), seed=None):
+        """开始集群模拟：count辆车随机分布在迷宫里，种类轮流分配"""
+        self.swarm = Swarm(self.maze, count, kinds, seed)
+        self.update()
+
+    def stop_swarm(self):
+        self.swarm = None
+        self.update()
+
+    def swarm_step(self):
+        """集群所有车走一步并整体重绘，返回仍在行驶的车数"""
+        if self.swarm is None:
+            return 0
+        remaining = self.swarm.step()
+        if self.profiler.enabled:
+            self.profiler.record_step()
+        self.update()
+        return remaining
+
+    def start_dynamic_solve(self, planner=None, stats=None):
+        """进入动态障碍模式：使用后台规划好的D* Lite规划器，没有时从小车当前位置当场建立"""
+        if planner is None:
+            if self.maze.is_exit(self.car_pos):
+                self.car_pos = self.maze.start
+            stats = SearchStats()
+            planner = plan(self.maze, self.car_pos, stats)
+        self.planner = planner
+        self.replan_log = []
+        self.path_index = 0
+        self.record_plan(stats)
+        self.walls_editable = True
+
+    def stop_dynamic_solve(self):
+        self.planner = None
+        self.walls_editable = False
+
+    def replan(self):
+        """墙变化后增量修复规划"""
+        stats = SearchStats()
+        self.planner.compute_shortest_path(stats)
+        self.record_plan(stats)
+
+    def record_plan(self, stats):
+        """记录一次规划的开销，路线显示为覆盖层"""
+        self.solver_stats = stats
+        self.replan_log.append(stats.as_dict())
+        if self.profiler.enabled:
+            self.profiler.record_solver(stats, stats.elapsed)
+        self.optimal_path = self.planner.path() or []
+
+    def dynamic_step(self):
+        """动态障碍模式的一步：沿当前规划走一格；暂时无路时原地等待墙被打开
+
+        到达出口时返回False。
+        """
+        if self.planner is None:
             return False
-        if dy == 1 and current_cell & 4:  # 下墙
+        if self.maze.is_exit(self.car_pos):
+            self.reached_end.emit()
             return False
-        if dy == -1 and current_cell & 1:  # 上墙
+        nxt = self.planner.next_position()
+        if nxt is None:
+            return True
+        self.car_pos = nxt
+        self.planner.move_to(nxt)
+        if self.maze.is_exit(self.car_pos):
+            self.reached_end.emit()
             return False
         return True
 
-    def wall_follow_step(self):
-        """改进的墙壁跟随算法，支持多出口"""
-        if not self.is_running or self.car_pos in self.exits:
-            if self.car_pos in self.exits:
-                self.is_running = False
-                self.reached_end.emit()
+    def mouseMoveEvent(self, event):
+        if self._drag_start is None:
             return
-
-        # 保持原有的墙壁跟随逻辑
-        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-        current_dx, current_dy = directions[self.current_direction]
-        right_direction = (self.current_direction + 1) % 4
-        right_dx, right_dy = directions[right_direction]
-        front_dx, front_dy = current_dx, current_dy
-        left_direction = (self.current_direction - 1) % 4
-        left_dx, left_dy = directions[left_direction]
-        
-        if self.can_move(right_dx, right_dy):
-            self.current_direction = right_direction
-            self.car_pos = (self.car_pos[0] + right_dx, self.car_pos[1] + right_dy)
-            self.last_turn = 2
-            self.stuck_count = 0
-        elif self.can_move(front_dx, front_dy):
-            self.car_pos = (self.car_pos[0] + front_dx, self.car_pos[1] + front_dy)
-            self.last_turn = 0
-            self.stuck_count = 0
-        elif self.can_move(left_dx, left_dy):
-            self.current_direction = left_direction
-            self.car_pos = (self.car_pos[0] + left_dx, self.car_pos[1] + left_dy)
-            self.last_turn = 1
-            self.stuck_count = 0
-        else:
-            self.current_direction = (self.current_direction + 2) % 4
-            self.stuck_count += 1
-            if self.stuck_count > 3:
-                self.current_direction = random.randint(0, 3)
-                self.stuck_count = 0
-        
+        start, origin = self._drag_start
+        delta = event.pos() - start
+        self.follow_car = False  # 手动平移后不再自动跟随
+        self.origin = [origin[0] - delta.x(), origin[1] - delta.y()]
+        self.clamp_origin()
         self.update()
 
-    def start_wall_follow(self):
-        """开始墙壁跟随"""
+    def mouseReleaseEvent(self, event):
+        self._drag_start = None
+
+    def resizeEvent(self, event):
+        self.clamp_origin()
+        if self.follow_car:
+            self.ensure_car_visible()
+
+    def run_steps(self, step, count):
+        """连续执行最多count步模拟，期间不重绘，结束后只重绘小车的新旧位置
+
+        step() 返回False表示模拟结束；返回值同样表示是否还要继续。
+        """
+        old = self._car_pos
+        before = old
+        drawn = self.car_rect().toAlignedRect()
+        running = True
+        self._batching = True
+        try:
+            for _ in range(count):
+                before = self._car_pos
+                if not step():
+                    running = False
+                    break
+        finally:
+            self._batching = False
+        self._from_pos = before
+        self._blend = 0.0 if running else 1.0
+        if old != self._car_pos:
+            self.update(drawn)
+            self.update(self.car_rect().toAlignedRect())
+            self.update(self.cell_rect(*self._car_pos))
+            if self.follow_car:
+                self.ensure_car_visible()
+        return running
+
+    def set_blend(self, blend):
+        """模拟时钟每帧调用：更新插值比例，只重绘上一格和当前格"""
+        if not self.smooth or self._from_pos is None:
+            return
+        self._blend = blend
+        self.update(self.cell_rect(*self._from_pos).united(self.cell_rect(*self.car_pos)))
+
+    def set_smooth(self, enabled):
+        self.smooth = enabled
+        self.update(self.cell_rect(*self.car_pos))
+
+    def reset_car(self):
+        """重置小车位置"""
+        self.car_pos = (0, 0)
+
+    def can_move(self, dx, dy):
+        """检查是否可以移动到指定方向"""
+        return self.maze.can_move(self.car_pos[0], self.car_pos[1], dx, dy)
+
+    def wall_follow_step(self):
+        """回放预先算好的沿墙轨迹的一步，支持多出口；轨迹放完时返回False"""
+        if not self.is_running:
+            return False
+
+        result = self.wall_follow_result
+        if self.replay_index < result.steps:
+            self.car_pos = result.position(self.replay_index)
+            self.replay_index += 1
+            return True
+
+        # 轨迹放完了：要么到达出口，要么检测到循环
+        self.is_running = False
+        if result.reached_exit:
+            self.reached_end.emit()
+        elif result.looped:
+            self.loop_detected.emit()
+        return False
+
+    def start_wall_follow(self, result=None):
+        """开始墙壁跟随：一次性算出整条轨迹（或使用后台算好的result），界面线程只负责回放"""
         self.is_running = True
-        self.current_direction = 1  # 重置方向为向右
-        self.stuck_count = 0
+        if result is None:
+            result = follow_walls(self.maze, self.car_pos)  # 方向重置为向右
+        self.wall_follow_result = result
+        self.replay_index = 0
 
     def stop_wall_follow(self):
         """停止墙壁跟随"""
         self.is_running = False
 
-    def manhattan_distance(self, pos1, pos2):
-        """计算曼哈顿距离"""
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
-
     def find_optimal_path(self):
-        """使用A*算法找到到最近出口的最优路径"""
-        start = (0, 0)
-        
-        # 优先队列，存储 (f_score, pos, path)
-        if self.is_complex_maze:
-            # 多出口模式：计算到最近出口的距离
-            initial_score = min(self.manhattan_distance(start, exit_pos) for exit_pos in self.exits)
+        """沿出口距离场的梯度找到从小车当前位置到最近出口的最优路径"""
+        began = time.perf_counter()
+        stats = SearchStats()
+        field = distance_field(self.maze, stats)
+        path = field.route(self.car_pos)
+        if path is None:
+            return False
+        self.optimal_path = path
+        # 命中缓存时没有展开任何节点，计数由建场的一方（如后台任务）记录
+        if stats.nodes_expanded:
+            stats.path_length = len(path)
+            self.solver_stats = stats
+            if self.profiler.enabled:
+                self.profiler.record_solver(stats, time.perf_counter() - began)
+        return True
+
+    def set_show_route(self, enabled):
+        """开关手动模式的路线提示"""
+        self.show_route = enabled
+        if enabled:
+            self.update_route_hint()
         else:
-            # 单出口模式：使用唯一的出口
-            initial_score = self.manhattan_distance(start, (self.size-1, self.size-1))
-            
-        open_set = [(initial_score, start, [start])]
-        heapq.heapify(open_set)
-        
-        # 已访问的节点集合
-        closed_set = set()
-        
-        # g_score[pos] 存储从起点到pos的实际距离
-        g_score = {start: 0}
-        
-        while open_set:
-            _, current, path = heapq.heappop(open_set)
-            
-            # 检查是否到达出口
-            if self.is_complex_maze:
-                if current in self.exits:
-                    self.optimal_path = path
-                    return True
-            else:
-                if current == (self.size-1, self.size-1):
-                    self.optimal_path = path
-                    return True
-                
-            if current in closed_set:
-                continue
-                
-            closed_set.add(current)
-            
-            # 检查四个方向
-            for dx, dy in [(0, -1), (1, 0), (0, 1), (-1, 0)]:
-                next_x = current[0] + dx
-                next_y = current[1] + dy
-                next_pos = (next_x, next_y)
-                
-                if not self.can_move_between(current, next_pos):
-                    continue
-                
-                tentative_g_score = g_score[current] + 1
-                
-                if next_pos in g_score and tentative_g_score >= g_score[next_pos]:
-                    continue
-                
-                g_score[next_pos] = tentative_g_score
-                
-                # 计算启发式距离
-                if self.is_complex_maze:
-                    h_score = min(self.manhattan_distance(next_pos, exit_pos) 
-                                for exit_pos in self.exits)
-                else:
-                    h_score = self.manhattan_distance(next_pos, (self.size-1, self.size-1))
-                
-                f_score = tentative_g_score + h_score
-                heapq.heappush(open_set, (f_score, next_pos, path + [next_pos]))
-        
-        return False
+            self.optimal_path = []
+
+    def set_route_index(self, maze, index):
+        """后台建好的路线索引；期间已换了迷宫时丢弃"""
+        if maze is not self.maze:
+            return
+        self.route_index = index
+        self.update_route_hint()
+
+    def update_route_hint(self):
+        """从路线索引取出小车到最近出口的路线，每步只是O(路线长度)的查表
+
+        索引还没在后台建好时不显示。
+        """
+        if not self.show_route or self.route_index is None:
+            return
+        index = self.route_index
+        if isinstance(index, DistanceField):
+            path = index.route(self.car_pos)
+        else:
+            nearest = index.nearest(self.car_pos)
+            path = index.route(self.car_pos, nearest[0]) if nearest is not None else None
+        self.optimal_path = path or []
 
     def can_move_between(self, pos1, pos2):
         """检查两个相邻位置之间是否可以移动"""
-        if not (0 <= pos2[0] < self.size and 0 <= pos2[1] < self.size):
-            return False
-            
-        dx = pos2[0] - pos1[0]
-        dy = pos2[1] - pos1[1]
-        
-        # 检查墙的存在
-        if dx == 1:  # 向右移动
-            return not (self.maze[pos1[1]][pos1[0]] & 2)
-        elif dx == -1:  # 向左移动
-            return not (self.maze[pos1[1]][pos1[0]] & 8)
-        elif dy == 1:  # 向下移动
-            return not (self.maze[pos1[1]][pos1[0]] & 4)
-        elif dy == -1:  # 向上移动
-            return not (self.maze[pos1[1]][pos1[0]] & 1)
-        return False
+        return self.maze.can_move_between(pos1, pos2)
 
     def auto_solve_step(self):
-        """执行智能寻路的一步"""
+        """执行智能寻路的一步；到达终点或找不到路径时返回False"""
         if not self.optimal_path:
             if not self.find_optimal_path():
                 print("无法找到路径！")
-                return
+                return False
             self.path_index = 0
             
         # 检查是否到达终点
-        if self.is_complex_maze:
-            if self.car_pos in self.exits:
-                self.reached_end.emit()
-                return
-        else:
-            if self.car_pos == (self.size-1, self.size-1):
-                self.reached_end.emit()
-                return
+        if self.maze.is_exit(self.car_pos):
+            self.reached_end.emit()
+            return False
             
         # 按照预计算的路径移动
         if self.path_index < len(self.optimal_path):
             self.car_pos = self.optimal_path[self.path_index]
             self.path_index += 1
-            self.update()
             
             # 再次检查是否到达终点
-            if self.is_complex_maze:
-                if self.car_pos in self.exits:
-                    self.reached_end.emit()
-            else:
-                if self.car_pos == (self.size-1, self.size-1):
-                    self.reached_end.emit()
+            if self.maze.is_exit(self.car_pos):
+                self.reached_end.emit()
+                return False
+        return True
 
     def start_auto_solve(self):
         """开始智能求解"""
         self.optimal_path = []
         self.path_index = 0
-        self.car_pos = (0, 0)
-        self.update()
+        # 从小车当前位置出发求解；已经在出口时回到起点
+        if self.maze.is_exit(self.car_pos):
+            self.car_pos = self.maze.start
 
-    def reset_to_single_exit(self):
+    def start_recording(self, kind):
+        """从小车当前位置开始记录一次运行的轨迹，kind 为运行模式"""
+        self.trajectory = Trajectory(self.car_pos, maze_identity(self.maze), kind)
+        self.recording = True
+
+    def stop_recording(self):
+        self.recording = False
+
+    def seek(self, step):
+        """回放定位到轨迹的第step步：从最近的关键帧算出位置，与轨迹长度无关"""
+        self.recording = False
+        self.playback_index = step
+        self.car_pos = self.trajectory.position(step)
+
+    def playback_step(self):
+        """回放轨迹的下一步；放完时返回False"""
+        trajectory = self.trajectory
+        if trajectory is None or self.playback_index >= trajectory.steps:
+            return False
+        dx, dy = DIRECTIONS[trajectory.direction(self.playback_index)]
+        self.playback_index += 1
+        self.car_pos = (self.car_pos[0] + dx, self.car_pos[1] + dy)
+        return True
+
+    def reset_to_single_exit(self, seed=None):
         """重置为单出口迷宫"""
-        self.maze = self.generate_maze()
-        self.car_pos = (0, 0)
-        self.optimal_path = []
-        self.path_index = 0
-        self.is_complex_maze = False
-        self.exits = [(self.size-1, self.size-1)]
-        self.update()
+        self.set_maze(self.generate_maze(seed))
@@ -0,0 +1,115 @@
+# widgets/profiler.py
+import csv
+import json
+import time
+from collections import deque
+
+SAMPLE_LIMIT = 2000  # 每类指标最多保留的样本数
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Profiler:
+    """运行时性能记录：绘制耗时、定时器抖动、每秒步数和求解器计数
+
+    关闭时调用方只做一次 enabled 判断，不取时间、不记录样本。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.frames = deque(maxlen=SAMPLE_LIMIT)   # (时间戳, 绘制耗时)
+        self.ticks = {}                            # 定时器名 -> deque[(时间戳, 抖动)]
+        self.steps = deque(maxlen=SAMPLE_LIMIT)    # 小车每一步的时间戳
+        self.solver = {}                           # 最近一次求解的计数
+        self._last_tick = {}
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self.reset()
+
+    def record_frame(self, began):
+        """记录一帧绘制，began 为绘制开始时的 perf_counter()"""
+        now = time.perf_counter()
+        self.frames.append((now, now - began))
+
+    def record_tick(self, name, interval_ms):
+        """记录一次定时器回调，和上一次回调的间隔减去设定间隔即为抖动"""
+        now = time.perf_counter()
+        last = self._last_tick.get(name)
+        self._last_tick[name] = now
+        if last is None:
+            return
+        jitter = (now - last) - interval_ms / 1000.0
+        self.ticks.setdefault(name, deque(maxlen=SAMPLE_LIMIT)).append((now, jitter))
+
+    def record_step(self):
+        self.steps.append(time.perf_counter())
+
+    def record_solver(self, stats, time_to_path):
+        """记录求解器计数：展开节点数、开放集峰值和从开始求解到拿到路径的时间"""
+        self.solver = dict(stats.as_dict(), time_to_path=time_to_path)
+
+    def steps_per_second(self, window=1.0):
+        now = time.perf_counter()
+        return sum(1 for stamp in self.steps if now - stamp <= window) / window
+
+    def summary(self):
+        paint = [duration for _, duration in self.frames]
+        result = {
+            'frames': len(paint),
+            'paint_ms_avg': 1000 * sum(paint) / len(paint) if paint else 0.0,
+            'paint_ms_p95': 1000 * _percentile(paint, 0.95),
+            'paint_ms_max': 1000 * max(paint) if paint else 0.0,
+            'steps_per_second': self.steps_per_second(),
+        }
+        for name, samples in self.ticks.items():
+            jitter = [abs(value) for _, value in samples]
+            result[f'{name}_jitter_ms_avg'] = 1000 * sum(jitter) / len(jitter)
+            result[f'{name}_jitter_ms_max'] = 1000 * max(jitter)
+        for key, value in self.solver.items():
+            result[f'solver_{key}'] = value
+        return result
+
+    def overlay_lines(self):
+        """屏幕叠加层上显示的几行文字"""
+        info = self.summary()
+        lines = [
+            f"绘制 {info['paint_ms_avg']:.2f} ms (p95 {info['paint_ms_p95']:.2f}, 最大 {info['paint_ms_max']:.2f})",
+            f"步数 {info['steps_per_second']:.0f} /s",
+        ]
+        for name in sorted(self.ticks):
+            lines.append(f"{name} 抖动 {info[f'{name}_jitter_ms_avg']:.1f} ms "
+                         f"(最大 {info[f'{name}_jitter_ms_max']:.1f})")
+        if self.solver:
+            lines.append(f"求解 展开 {self.solver.get('nodes_expanded', 0)} 节点, "
+                         f"{1000 * self.solver.get('time_to_path', 0.0):.1f} ms 出路径")
+        return lines
+
+    def samples(self):
+        """全部样本，按 (时间, 类别, 名称, 数值) 排列；时间相对于开始记录时刻"""
+        rows = [(stamp - self.started, 'frame', 'paint', duration) for stamp, duration in self.frames]
+        for name, samples in self.ticks.items():
+            rows.extend((stamp - self.started, 'tick', name, jitter) for stamp, jitter in samples)
+        rows.extend((stamp - self.started, 'step', 'car', 1) for stamp in self.steps)
+        rows.sort(key=lambda row: row[0])
+        return rows
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': self.summary(), 'samples': self.samples()}, f, indent=2)
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['time', 'kind', 'name', 'value'])
+            writer.writerows(self.samples())
@@ -0,0 +1,72 @@
+# widgets/sim_clock.py
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+FRAME_INTERVAL = 16  # 绘制帧间隔（毫秒），约60帧每秒
+MIN_SPEED = 1        # 模拟速度范围（步/秒）
+MAX_SPEED = 100000
+MAX_BACKLOG = 0.1    # 一帧最多补上这么多秒的模拟，卡顿之后不会一次补走太多步
+FRAME_BUDGET = 0.012  # 每帧用于模拟的时间上限（秒），剩下的留给绘制
+
+
+class SimulationClock(QObject):
+    """与绘制分开的模拟时钟
+
+    按显示刷新率触发帧，每帧按经过的真实时间和速度（步/秒）算出该走几步，
+    交给 step_batch(步数) 一次执行完，界面只在帧末重绘一次。step_batch 返回
+    False 表示模拟结束，时钟随即停止。不足一步的余量作为插值系数随 frame 信号发出，
+    用于在两格之间平滑显示小车。
+
+    每步的耗时由上一帧测得，一帧的步数不超过 FRAME_BUDGET 内能走完的步数；
+    步进太慢跟不上设定速度时丢弃积压，实际速度降下来但界面不会卡住。
+    """
+
+    frame = pyqtSignal(float)  # 本帧的插值系数，范围 [0, 1)
+
+    def __init__(self, step_batch, speed=10, parent=None):
+        super().__init__(parent)
+        self.step_batch = step_batch
+        self.speed = speed
+        self._carry = 0.0
+        self._last = None
+        self._limit = 1  # 一帧最多走的步数，第一帧测出每步耗时后更新
+        self._timer = QTimer(self)
+        self._timer.setInterval(FRAME_INTERVAL)
+        self._timer.timeout.connect(self.tick)
+
+    def set_speed(self, speed):
+        self.speed = max(MIN_SPEED, min(MAX_SPEED, speed))
+
+    def start(self):
+        """开始计时；第一步在经过 1/速度 秒后执行"""
+        self._carry = 0.0
+        self._last = time.perf_counter()
+        self._limit = 1
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def is_active(self):
+        return self._timer.isActive()
+
+    def tick(self):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self._carry = min(self._carry + elapsed * self.speed, max(1.0, self.speed * MAX_BACKLOG))
+        count = int(self._carry)
+        self._carry -= count
+        if count:
+            if count > self._limit:
+                count = self._limit
+            began = time.perf_counter()
+            running = self.step_batch(count)
+            cost = (time.perf_counter() - began) / count
+            self._limit = max(1, int(FRAME_BUDGET / cost)) if cost > 0 else MAX_SPEED
+            if not running:
+                self.stop()
+                return
+        if self.is_active():
+            self.frame.emit(self._carry)
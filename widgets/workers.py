@@ -0,0 +1,57 @@
+# widgets/workers.py
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class Cancelled(Exception):
+    """任务被取消时由进度回调抛出，算法内部不需要捕获"""
+
+
+class TaskSignals(QObject):
+    progress = pyqtSignal(int)     # 进度百分比
+    finished = pyqtSignal(object)  # 任务结果
+    failed = pyqtSignal(str)       # 异常的回溯信息
+    cancelled = pyqtSignal()
+
+
+class Task(QRunnable):
+    """在线程池里运行 fn(*args, progress=回调)
+
+    算法定期调用 progress(已完成, 总数)：回调把进度转成百分比信号发回界面线程，
+    任务已取消时直接抛出 Cancelled 中断计算。结果通过 finished 信号交回界面线程。
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self.is_cancelled = False
+        self._percent = -1
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def report(self, done, total):
+        if self.is_cancelled:
+            raise Cancelled()
+        percent = min(100, 100 * done // max(total, 1))
+        if percent != self._percent:
+            self._percent = percent
+            self.signals.progress.emit(percent)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, progress=self.report, **self.kwargs)
+        except Cancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception:
+            self.signals.failed.emit(traceback.format_exc())
+            return
+        if self.is_cancelled:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)